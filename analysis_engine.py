@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Sections du rapport, dans l'ordre : (classe d'actifs, type de mouvement, titre)
+SECTIONS = [
+    ('ETF', 'Gainer', 'Top Gainers ETFs (5 Days)'),
+    ('ETF', 'Loser', 'Top Losers ETFs (5 Days)'),
+    ('CFD', 'Gainer', 'Top Gainers CFDs (Last Day)'),
+    ('CFD', 'Loser', 'Top Losers CFDs (Last Day)'),
+    ('Forex', 'Gainer', 'Top Gainers Forex Pairs (Last Day)'),
+    ('Forex', 'Loser', 'Top Losers Forex Pairs (Last Day)'),
+]
+
+MOVEMENT_THRESHOLD = 2
+TP_PCT = 0.02
+
+
+def symbol_metrics(data, symbols):
+    # Remplissage, rendements et extrêmes calculés une seule fois pour tous les symboles retenus
+    close = data.xs('Close', axis=1, level=1)[symbols].ffill().bfill()
+    mean_returns = close.pct_change().mean().to_numpy()
+    values = close.to_numpy(dtype=np.float64)
+    lowest = values.min(axis=0)
+    return pd.DataFrame({
+        'recent_close': values[-1],
+        'max_profit': (values.max(axis=0) - lowest) / lowest * 100,
+        'mean_return': mean_returns,
+    }, index=pd.Index(symbols, name='symbol'))
+
+
+def movement_actions(changes):
+    changes = np.asarray(changes, dtype=np.float64)
+    return np.where(changes > MOVEMENT_THRESHOLD, 'buy', np.where(changes < -MOVEMENT_THRESHOLD, 'short', 'hold'))
+
+
+def take_profits(recent_close, actions):
+    return np.where(actions == 'buy', recent_close * (1 + TP_PCT),
+                    np.where(actions == 'short', recent_close * (1 - TP_PCT), recent_close))
+
+
+def durations(recent_close, tp, mean_return, actions):
+    movement = np.where(actions == 'short', -mean_return, mean_return)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        duration = np.where(movement != 0, np.abs(tp - recent_close) / (recent_close * movement), np.inf)
+    return np.where(actions == 'hold', 0.0, duration)
+
+
+def build_analysis_table(data_by_class, movers_by_class):
+    rows = []
+    for asset_class, kind, title in SECTIONS:
+        if asset_class not in movers_by_class:
+            continue
+        gainers, losers = movers_by_class[asset_class]
+        for symbol, change in (gainers if kind == 'Gainer' else losers):
+            rows.append((asset_class, kind, title, symbol, float(change)))
+    table = pd.DataFrame(rows, columns=['asset_class', 'kind', 'section', 'symbol', 'change'])
+    if table.empty:
+        return table.assign(action=[], tp=[], max_profit=[], duration=[], recent_close=[])
+
+    metrics = pd.concat([
+        symbol_metrics(data_by_class[asset_class], list(dict.fromkeys(group['symbol'])))
+        .assign(asset_class=asset_class).reset_index()
+        for asset_class, group in table.groupby('asset_class', sort=False)
+    ])
+    table = table.merge(metrics, on=['asset_class', 'symbol'], how='left')
+
+    actions = movement_actions(table['change'])
+    recent_close = table['recent_close'].to_numpy()
+    tp = take_profits(recent_close, actions)
+    table['action'] = actions
+    table['tp'] = tp
+    table['duration'] = durations(recent_close, tp, table['mean_return'].to_numpy(), actions)
+    return table[['asset_class', 'kind', 'section', 'symbol', 'change', 'action', 'tp', 'max_profit', 'duration', 'recent_close']]
+
+
+# Gestion du risque : stop loss et take profit en pourcentage du prix actuel
+CAPITAL = 10000
+RISK_PER_TRADE = 0.01
+STOP_LOSS_PCT = 0.02
+TAKE_PROFIT_PCT = 0.04
+
+
+def prediction_array(predictions):
+    # Les prédictions absentes ("N/A", None) deviennent NaN : toute comparaison avec le TP est alors fausse
+    return pd.to_numeric(pd.Series(list(predictions), dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def risk_levels(current_price, actions, capital=CAPITAL, risk_per_trade=RISK_PER_TRADE,
+                stop_loss_pct=STOP_LOSS_PCT, take_profit_pct=TAKE_PROFIT_PCT):
+    current_price = np.asarray(current_price, dtype=np.float64)
+    actions = np.asarray(actions)
+    direction = np.where(actions == 'buy', 1.0, np.where(actions == 'short', -1.0, 0.0))
+    stop_loss = current_price * (1 - direction * stop_loss_pct)
+    take_profit = current_price * (1 + direction * take_profit_pct)
+    risk = np.abs(current_price - stop_loss)
+    # Éviter la division par zéro
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position_size = np.where(risk != 0, capital * risk_per_trade / risk, 0.0)
+    return position_size, stop_loss, take_profit
+
+
+def confirmed_by_models(reg_pred, rf_pred, actions, tp):
+    reg_pred, rf_pred = prediction_array(reg_pred), prediction_array(rf_pred)
+    tp = np.asarray(tp, dtype=np.float64)
+    actions = np.asarray(actions)
+    with np.errstate(invalid='ignore'):
+        above = (reg_pred > tp) & (rf_pred > tp)
+        below = (reg_pred < tp) & (rf_pred < tp)
+    return ((actions == 'buy') & above) | ((actions == 'short') & below)
+
+
+def reliability_scores(reg_pred, rf_pred, actions, tp):
+    return np.where(confirmed_by_models(reg_pred, rf_pred, actions, tp), 'High Confidence', 'Low Confidence')
+
+
+def score_candidates(table, reg_pred, rf_pred, capital=CAPITAL, risk_per_trade=RISK_PER_TRADE,
+                     stop_loss_pct=STOP_LOSS_PCT, take_profit_pct=TAKE_PROFIT_PCT):
+    # Taille de position, niveaux de sortie et fiabilité de tous les candidats en une passe
+    actions = table['action'].to_numpy()
+    position_size, stop_loss, take_profit = risk_levels(
+        table['recent_close'].to_numpy(), actions, capital, risk_per_trade, stop_loss_pct, take_profit_pct)
+    reg_pred, rf_pred = prediction_array(reg_pred), prediction_array(rf_pred)
+    confirmed = confirmed_by_models(reg_pred, rf_pred, actions, table['tp'].to_numpy())
+    # Un gagnant n'est cohérent qu'à l'achat, un perdant qu'à la vente à découvert
+    expected = np.where(table['kind'].to_numpy() == 'Gainer', 'buy', 'short')
+    return table.assign(
+        reg_pred=reg_pred,
+        rf_pred=rf_pred,
+        position_size=position_size,
+        stop_loss=stop_loss,
+        take_profit=take_profit,
+        comments=np.where(confirmed & (actions == expected), 'Consistent', 'Contradictory'),
+        reliability=np.where(confirmed, 'High Confidence', 'Low Confidence'),
+    )
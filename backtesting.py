@@ -14,23 +14,114 @@ def simple_moving_average_strategy(data, short_window=40, long_window=100):
 
     return signals
 
-def backtest_strategy(data, symbol, signals, initial_balance=10000.0):
-    positions = pd.DataFrame(index=signals.index).fillna(0.0)
-    positions[symbol] = signals['signal']
-    portfolio = positions.multiply(data['Close'], axis=0)
-    pos_diff = positions.diff()
-    portfolio['holdings'] = (positions.multiply(data['Close'], axis=0)).sum(axis=1)
-    portfolio['cash'] = initial_balance - (pos_diff.multiply(data['Close'], axis=0)).sum(axis=1).cumsum()
-    portfolio['total'] = portfolio['cash'] + portfolio['holdings']
-    trading_log = []
-
-    for date in portfolio.index:
-        if signals['positions'].loc[date] == 1.0:
-            trading_log.append((date, 'buy', data['Close'].loc[date], portfolio['total'].loc[date]))
-        elif signals['positions'].loc[date] == -1.0:
-            trading_log.append((date, 'sell', data['Close'].loc[date], portfolio['total'].loc[date]))
-
-    return portfolio['total'].iloc[-1], trading_log
+TRADE_LOG_DTYPE = np.dtype([('index', np.int64), ('side', 'U4'), ('price', np.float64), ('balance', np.float64)])
+
+def backtest_arrays(close, signal, positions=None, initial_balance=10000.0):
+    close = np.asarray(close, dtype=np.float64)
+    signal = np.asarray(signal, dtype=np.float64)
+    if positions is None:
+        positions = np.empty_like(signal)
+        positions[:1] = np.nan
+        positions[1:] = np.diff(signal)
+    else:
+        positions = np.asarray(positions, dtype=np.float64)
+
+    # Mêmes conventions que le calcul pandas : les valeurs manquantes ne comptent pas
+    holdings = np.nan_to_num(signal * close)
+    pos_diff = np.empty_like(signal)
+    pos_diff[:1] = 0.0
+    pos_diff[1:] = np.diff(signal)
+    cash = initial_balance - np.cumsum(np.nan_to_num(pos_diff * close))
+    equity = cash + holdings
+
+    buys = positions == 1.0
+    sells = positions == -1.0
+    events = np.flatnonzero(buys | sells)
+    trade_log = np.empty(len(events), dtype=TRADE_LOG_DTYPE)
+    trade_log['index'] = events
+    trade_log['side'] = np.where(buys[events], 'buy', 'sell')
+    trade_log['price'] = close[events]
+    trade_log['balance'] = equity[events]
+    return equity, trade_log
+
+def backtest_strategy(data, symbol, signals, initial_balance=10000.0, return_equity=False):
+    close = data['Close'].reindex(signals.index)
+    equity, trade_log = backtest_arrays(close.to_numpy(), signals['signal'].to_numpy(),
+                                        signals['positions'].to_numpy(), initial_balance)
+    dates = signals.index[trade_log['index']]
+    trading_log = [
+        (date, str(side), price, balance)
+        for date, side, price, balance in zip(dates, trade_log['side'], trade_log['price'], trade_log['balance'])
+    ]
+    if return_equity:
+        return equity[-1], trading_log, pd.Series(equity, index=signals.index, name=symbol)
+    return equity[-1], trading_log
+
+PORTFOLIO_TRADE_DTYPE = np.dtype([('index', np.int64), ('symbol', np.int64), ('side', 'U4'), ('shares', np.float64), ('price', np.float64)])
+
+def _ffill_rows(matrix):
+    valid = ~np.isnan(matrix)
+    rows = np.where(valid, np.arange(matrix.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return np.take_along_axis(matrix, rows, axis=0)
+
+def backtest_portfolio(prices, signals, capital=10000.0, risk_per_trade=0.01, stop_loss_pct=0.02):
+    # prices, signals : matrices alignées (temps x symbole) ; signal 1 = long, -1 = short, 0 = hors marché
+    prices = _ffill_rows(np.asarray(prices, dtype=np.float64))
+    signals = np.nan_to_num(np.asarray(signals, dtype=np.float64))
+    n_bars, n_symbols = prices.shape
+
+    # Taille de position demandée à l'entrée, même règle que calculate_risk_management :
+    # (capital * risque par trade) / écart entre le prix et le stop loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        unit_size = np.nan_to_num((capital * risk_per_trade) / (prices * stop_loss_pct), nan=0.0, posinf=0.0)
+    previous = np.vstack([np.zeros((1, n_symbols)), signals[:-1]])
+    changes = signals != previous
+    entries = changes & (signals != 0)
+    marks = np.nan_to_num(prices)
+
+    # Le cash dépend des entrées précédentes : boucle sur les barres, vectorisée sur les symboles.
+    # Pas de levier : l'exposition brute (longs + shorts) ne dépasse jamais l'équité du compte,
+    # donc le cash reste positif ; les entrées d'une barre sont réduites au prorata si besoin.
+    shares = np.zeros((n_bars, n_symbols))
+    cash = np.empty(n_bars)
+    equity = np.empty(n_bars)
+    held = np.zeros(n_symbols)
+    balance = capital
+    for t in range(n_bars):
+        account = balance + held @ marks[t]
+        if changes[t].any():
+            # Sorties d'abord : elles libèrent le capital utilisé par les entrées de la même barre
+            exits = changes[t] & (held != 0)
+            balance += held[exits] @ marks[t, exits]
+            held[exits] = 0.0
+            if entries[t].any():
+                free = account - np.abs(held) @ marks[t]
+                requested = unit_size[t, entries[t]] * marks[t, entries[t]]
+                total = requested.sum()
+                scale = min(1.0, max(free, 0.0) / total) if total > 0 else 0.0
+                held[entries[t]] = signals[t, entries[t]] * unit_size[t, entries[t]] * scale
+                balance -= held[entries[t]] @ marks[t, entries[t]]
+        shares[t] = held
+        cash[t] = balance
+        equity[t] = account
+
+    trades = np.diff(shares, axis=0, prepend=0.0)
+    times, symbols = np.nonzero(trades)
+    trade_log = np.empty(len(times), dtype=PORTFOLIO_TRADE_DTYPE)
+    trade_log['index'] = times
+    trade_log['symbol'] = symbols
+    trade_log['side'] = np.where(trades[times, symbols] > 0, 'buy', 'sell')
+    trade_log['shares'] = trades[times, symbols]
+    trade_log['price'] = prices[times, symbols]
+    return equity, shares, trade_log
+
+def portfolio_matrices(data, symbols, strategy, **strategy_params):
+    closes = data.xs('Close', axis=1, level=1).reindex(columns=symbols)
+    signals = pd.DataFrame(index=closes.index, columns=symbols, dtype=float)
+    for symbol in symbols:
+        signals[symbol] = strategy(data[symbol].copy(), **strategy_params)['signal'].to_numpy()
+    return closes, signals
 
 def simple_strategy(data):
     signals = pd.DataFrame(index=data.index)
@@ -39,7 +130,7 @@ def simple_strategy(data):
     signals['positions'] = signals['signal'].diff()
     return signals
 
-def rsi_strategy(data, window=14):
+def rsi_strategy(data, window=14, overbought=70, oversold=30):
     delta = data['Close'].diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
@@ -47,7 +138,7 @@ def rsi_strategy(data, window=14):
     data['RSI'] = 100 - (100 / (1 + RS))
     signals = pd.DataFrame(index=data.index)
     signals['signal'] = 0.0
-    signals['signal'] = np.where(data['RSI'] > 70, -1.0, np.where(data['RSI'] < 30, 1.0, 0.0))
+    signals['signal'] = np.where(data['RSI'] > overbought, -1.0, np.where(data['RSI'] < oversold, 1.0, 0.0))
     signals['positions'] = signals['signal'].diff()
     return signals
 
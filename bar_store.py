@@ -0,0 +1,182 @@
+import logging
+import os
+import re
+import pandas as pd
+
+# Répertoire par défaut du cache local des barres OHLCV
+DEFAULT_STORE_DIR = 'data_cache'
+
+
+class YFinanceProvider:
+    name = 'yfinance'
+
+    def fetch(self, symbols, period=None, interval="5m", start=None):
+        import yfinance as yf
+        if start is not None:
+            return yf.download(symbols, start=start, interval=interval, group_by='ticker')
+        return yf.download(symbols, period=period, interval=interval, group_by='ticker')
+
+
+class FrameProvider:
+    # Fournisseur local (hors ligne) qui sert des barres depuis un DataFrame au format get_data
+    name = 'frame'
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def fetch(self, symbols, period=None, interval="5m", start=None):
+        self.calls.append((tuple(symbols), period, interval, start))
+        frames = {}
+        for symbol in symbols:
+            if symbol not in self.data.columns.get_level_values(0):
+                continue
+            frame = self.data[symbol]
+            if start is not None:
+                frame = frame[frame.index >= start]
+            elif period is not None:
+                frame = trim_to_period(frame, period)
+            frames[symbol] = frame
+        return to_multi_frame(frames)
+
+
+class BarStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def path(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9_.=-]', '_', symbol)
+        return os.path.join(self.root, interval, f"{safe_symbol}.parquet")
+
+    def load(self, symbol, interval):
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logging.error(f'Error reading stored bars for {symbol} ({interval}): {e}')
+            return None
+
+    def save(self, symbol, interval, frame):
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def last_timestamp(self, symbol, interval):
+        frame = self.load(symbol, interval)
+        if frame is None or frame.empty:
+            return None
+        return frame.index[-1]
+
+
+def to_multi_frame(frames):
+    frames = {symbol: frame for symbol, frame in frames.items() if frame is not None and not frame.empty}
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
+
+
+def with_missing_symbols(data, symbols):
+    # Comme yfinance, les symboles sans barres restent présents sous forme de colonnes NaN
+    if data.empty:
+        return data
+    fields = list(dict.fromkeys(data.columns.get_level_values(1)))
+    present = set(data.columns.get_level_values(0))
+    columns = [
+        column for symbol in symbols
+        for column in (data[symbol].columns.map(lambda field: (symbol, field)) if symbol in present else [(symbol, field) for field in fields])
+    ]
+    return data.reindex(columns=pd.MultiIndex.from_tuples(columns))
+
+
+def split_by_symbol(data, symbols):
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        # yfinance renvoie parfois des colonnes simples pour un seul symbole
+        return {symbols[0]: data} if len(symbols) == 1 else {}
+    present = set(data.columns.get_level_values(0))
+    return {symbol: data[symbol].dropna(how='all') for symbol in symbols if symbol in present}
+
+
+def period_to_offset(period):
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period or '')
+    if not match:
+        return None
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        return pd.Timedelta(days=count)
+    if unit == 'wk':
+        return pd.Timedelta(weeks=count)
+    if unit == 'mo':
+        return pd.DateOffset(months=count)
+    return pd.DateOffset(years=count)
+
+
+def trim_to_period(frame, period):
+    if frame.empty:
+        return frame
+    match = re.fullmatch(r'(\d+)d', period or '')
+    if match:
+        # Une période en jours correspond aux N dernières séances, comme yfinance
+        sessions = frame.index.normalize().unique()
+        first_session = sessions[-int(match.group(1)):][0]
+        return frame[frame.index >= first_session]
+    offset = period_to_offset(period)
+    if offset is None:
+        return frame
+    return frame[frame.index >= frame.index[-1] - offset]
+
+
+def merge_bars(stored, fresh):
+    if stored is None or stored.empty:
+        return fresh.sort_index() if fresh is not None else None
+    if fresh is None or fresh.empty:
+        return stored
+    merged = pd.concat([stored, fresh])
+    # La dernière barre stockée peut être incomplète : la version la plus récente l'emporte
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+
+def refresh_bars(symbols, period, interval, store, provider):
+    stored = {symbol: store.load(symbol, interval) for symbol in symbols}
+    offset = period_to_offset(period)
+    now = pd.Timestamp.now(tz='UTC')
+
+    cold, warm = [], []
+    for symbol in symbols:
+        frame = stored[symbol]
+        if frame is None or frame.empty:
+            cold.append(symbol)
+            continue
+        last = frame.index[-1]
+        last_utc = last.tz_convert('UTC') if last.tzinfo else last.tz_localize('UTC')
+        if offset is not None and last_utc < now - offset:
+            # Les barres stockées sont plus anciennes que la fenêtre demandée
+            cold.append(symbol)
+        else:
+            warm.append(symbol)
+
+    fresh = {}
+    if cold:
+        logging.info(f'Fetching full {period} window for {len(cold)} symbols from {provider.name}')
+        fresh.update(split_by_symbol(provider.fetch(cold, period=period, interval=interval), cold))
+    if warm:
+        start = min(stored[symbol].index[-1] for symbol in warm)
+        logging.info(f'Fetching bars after {start} for {len(warm)} symbols from {provider.name}')
+        fresh.update(split_by_symbol(provider.fetch(warm, interval=interval, start=start), warm))
+
+    frames = {}
+    for symbol in symbols:
+        merged = merge_bars(stored[symbol], fresh.get(symbol))
+        if merged is None or merged.empty:
+            logging.warning(f'No bars available for {symbol} ({interval})')
+            continue
+        if symbol in fresh:
+            store.save(symbol, interval, merged)
+        frames[symbol] = trim_to_period(merged, period)
+    return with_missing_symbols(to_multi_frame(frames), symbols)
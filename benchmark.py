@@ -0,0 +1,222 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import backtesting
+import machine_learning
+from movers_calculator import get_top_movers
+from technical_indicators import add_technical_indicators, calculate_rsi, calculate_macd, calculate_bollinger_bands
+from visualization import plot_price_and_indicators, plot_backtest_results
+from report_writer import ReportWriter
+from panel import OHLCV_FIELDS, build_panel
+
+# Fichier de référence par défaut des temps mesurés
+DEFAULT_BASELINE_FILE = os.path.join('benchmarks', 'baseline.json')
+# Ralentissement toléré par rapport à la référence avant de signaler une régression
+DEFAULT_TOLERANCE = 0.25
+
+
+def synthetic_ohlcv(n_symbols=10, n_bars=500, freq='D', seed=42, start='2024-01-02'):
+    # Même disposition que get_data : colonnes MultiIndex (symbole, champ), index de dates
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start=start, periods=n_bars, freq=freq, name='Date')
+    symbols = [f'SYM{i:03d}' for i in range(n_symbols)]
+
+    drift = rng.normal(0.0002, 0.0005, n_symbols)
+    volatility = rng.uniform(0.005, 0.03, n_symbols)
+    returns = rng.normal(drift, volatility, (n_bars, n_symbols))
+    close = rng.uniform(20, 500, n_symbols) * np.exp(np.cumsum(returns, axis=0))
+    open_ = np.vstack([close[:1], close[:-1]]) * (1 + rng.normal(0, volatility / 4, (n_bars, n_symbols)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, (n_bars, n_symbols))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, (n_bars, n_symbols))))
+    volume = rng.lognormal(13, 0.5, (n_bars, n_symbols)).round()
+
+    fields = {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Adj Close': close, 'Volume': volume}
+    values = np.stack([fields[field] for field in OHLCV_FIELDS], axis=2).reshape(n_bars, -1)
+    columns = pd.MultiIndex.from_product([symbols, OHLCV_FIELDS])
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def _symbols(data):
+    return list(dict.fromkeys(data.columns.get_level_values(0)))
+
+
+def bench_movers(data, output_dir):
+    get_top_movers(data)
+
+
+def bench_movers_panel(data, output_dir):
+    # Conversion comprise : c'est le coût réel pour un appelant qui part de get_data
+    get_top_movers(build_panel(data))
+
+
+def bench_indicators(data, output_dir):
+    # Sans symbole, le moteur d'indicateurs ne met rien en cache : on mesure le calcul complet
+    for symbol in _symbols(data):
+        add_technical_indicators(data[symbol])
+        calculate_rsi(data[symbol]['Close'])
+        calculate_macd(data[symbol]['Close'])
+        calculate_bollinger_bands(data[symbol]['Close'])
+
+
+def _bench_backtest(strategy_name):
+    def bench(data, output_dir):
+        strategy = getattr(backtesting, strategy_name)
+        for symbol in _symbols(data):
+            backtesting.backtest_strategy(data[symbol], symbol, strategy(data[symbol]))
+    return bench
+
+
+def _bench_training(trainer_name):
+    def bench(data, output_dir):
+        trainer = getattr(machine_learning, trainer_name)
+        for symbol in _symbols(data):
+            trainer(data[symbol].drop(columns=['Adj Close']), 'Close')
+    return bench
+
+
+def bench_clustering(data, output_dir):
+    for symbol in _symbols(data):
+        machine_learning.train_clustering_model(data[symbol][['Close', 'Volume']], n_clusters=3)
+
+
+def bench_plotting(data, output_dir):
+    for symbol in _symbols(data):
+        plot_price_and_indicators(symbol, data[symbol], add_technical_indicators(data[symbol]), output_dir)
+        _, trading_log = backtesting.backtest_strategy(data[symbol], symbol, backtesting.simple_moving_average_strategy(data[symbol]))
+        plot_backtest_results(symbol, data[symbol], trading_log, output_dir)
+
+
+def bench_excel(data, output_dir):
+    # Même format de lignes que le rapport de main, une ligne par barre des 100 dernières de chaque symbole
+    header = ["Category", "Symbol", "Percent Change", "Action", "TP", "Max Profit", "Duration", "Predicted Price (Reg)",
+              "Predicted Price (RF)", "Stop Loss", "Take Profit", "Comments", "Reliability"]
+    with ReportWriter(os.path.join(output_dir, 'benchmark.xlsx'), header=header) as report:
+        for symbol in _symbols(data):
+            report.append([f"Top Gainers {symbol}"])
+            for close in data[symbol]['Close'].iloc[-100:]:
+                report.append(["ETF Gainer", symbol, "2.50", "buy", f"{close * 1.02:.2f}", "5.00", "3.00", f"{close}",
+                               f"{close}", f"{close * 0.98:.2f}", f"{close * 1.04:.2f}", "Consistent", "High Confidence"])
+
+
+# Chemins critiques mesurés : nom -> fonction(data, output_dir)
+BENCHMARKS = {
+    'movers': bench_movers,
+    'movers_panel': bench_movers_panel,
+    'indicators': bench_indicators,
+    'backtest_sma': _bench_backtest('simple_moving_average_strategy'),
+    'backtest_simple': _bench_backtest('simple_strategy'),
+    'backtest_rsi': _bench_backtest('rsi_strategy'),
+    'train_regression': _bench_training('train_regression_model'),
+    'train_random_forest': _bench_training('train_random_forest_model'),
+    'clustering': bench_clustering,
+    'plotting': bench_plotting,
+    'write_to_excel': bench_excel,
+}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def run_benchmarks(symbol_counts=(5, 20), bar_counts=(250, 2000), names=None, repeat=3, seed=42):
+    results = []
+    names = list(names or BENCHMARKS)
+    for n_symbols in symbol_counts:
+        for n_bars in bar_counts:
+            data = synthetic_ohlcv(n_symbols, n_bars, seed=seed)
+            for name in names:
+                timings = []
+                with tempfile.TemporaryDirectory() as output_dir:
+                    # Premier appel non mesuré : imports paresseux, caches de polices matplotlib, etc.
+                    BENCHMARKS[name](data, output_dir)
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        BENCHMARKS[name](data, output_dir)
+                        timings.append(time.perf_counter() - started)
+                result = {
+                    'name': name, 'n_symbols': n_symbols, 'n_bars': n_bars,
+                    'best': min(timings), 'median': statistics.median(timings), 'repeat': repeat,
+                }
+                logging.info(f"Benchmark {name} ({n_symbols} symbols x {n_bars} bars): best {result['best']:.4f}s")
+                results.append(result)
+    return results
+
+
+def _key(result):
+    return f"{result['name']}[{result['n_symbols']}x{result['n_bars']}]"
+
+
+def save_baseline(results, path=DEFAULT_BASELINE_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({'environment': environment(), 'results': {_key(result): result for result in results}}, file, indent=2)
+
+
+def load_baseline(path=DEFAULT_BASELINE_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Compare le meilleur temps de chaque mesure à la référence ; ratio > 1 + tolérance = régression
+    rows = []
+    reference = baseline['results'] if baseline else {}
+    for result in results:
+        previous = reference.get(_key(result))
+        ratio = result['best'] / previous['best'] if previous and previous['best'] > 0 else None
+        rows.append({
+            'benchmark': _key(result),
+            'best': result['best'],
+            'baseline': previous['best'] if previous else None,
+            'ratio': ratio,
+            'regression': ratio is not None and ratio > 1 + tolerance,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the trade_ai hot paths on synthetic OHLCV data')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[5, 20])
+    parser.add_argument('--bars', type=int, nargs='+', default=[250, 2000])
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.symbols, args.bars, args.only, args.repeat, args.seed)
+    baseline = load_baseline(args.baseline)
+    report = compare(results, baseline, args.tolerance)
+    print(report.to_string(index=False))
+    if baseline is not None and baseline.get('environment') != environment():
+        print(f"Warning: baseline was recorded on a different environment: {baseline.get('environment')}")
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f'Baseline saved to {args.baseline}')
+    regressions = report[report['regression']]
+    if len(regressions):
+        print(f"Performance regressions (> {args.tolerance:.0%} slower): {', '.join(regressions['benchmark'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
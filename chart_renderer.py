@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from visualization import chart_path, plot_price_and_indicators, plot_backtest_results, plot_regression_results, plot_clustering_results
+
+# Graphiques connus du moteur de rendu : type -> fonction de visualization.py
+CHART_FUNCTIONS = {
+    'price_and_indicators': plot_price_and_indicators,
+    'backtest_results': plot_backtest_results,
+    'regression_results': plot_regression_results,
+    'clustering_results': plot_clustering_results,
+}
+# Hash des données de chaque graphique déjà rendu, conservé dans le répertoire de sortie
+MANIFEST_FILE = '.chart_manifest.json'
+
+
+def _update_hash(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in value:
+            digest.update(repr(key).encode())
+            _update_hash(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(pickle.dumps(value))
+    else:
+        digest.update(repr(value).encode())
+
+
+def input_hash(kind, *args):
+    digest = hashlib.sha1(kind.encode())
+    for value in args:
+        _update_hash(digest, value)
+    return digest.hexdigest()
+
+
+def _render(kind, args, kwargs):
+    started = time.perf_counter()
+    CHART_FUNCTIONS[kind](*args, **kwargs)
+    return time.perf_counter() - started
+
+
+class ChartRenderer:
+    def __init__(self, output_dir, max_workers=None, profile=None):
+        self.output_dir = output_dir
+        # Profil d'exécution optionnel (instrumentation.RunProfile) : temps de rendu de chaque graphique
+        self.profile = profile
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        self._manifest = self._load_manifest()
+        self.rendered = 0
+        self.skipped = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _load_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return {}
+        try:
+            with open(self._manifest_path) as file:
+                return json.load(file)
+        except Exception as e:
+            logging.error(f'Error reading chart manifest {self._manifest_path}: {e}')
+            return {}
+
+    def _save_manifest(self):
+        try:
+            tmp_path = f"{self._manifest_path}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(self._manifest, file, indent=0, sort_keys=True)
+            os.replace(tmp_path, self._manifest_path)
+        except Exception as e:
+            logging.error(f'Error saving chart manifest {self._manifest_path}: {e}')
+
+    def _done(self, kind, path, chart_hash, future):
+        with self._lock:
+            if future.exception() is not None:
+                logging.error(f'Error rendering {path}: {future.exception()}')
+                return
+            self._manifest[os.path.basename(path)] = chart_hash
+            self.rendered += 1
+        self._record(kind, path, future.result())
+
+    def _record(self, kind, path, elapsed):
+        if self.profile is not None:
+            self.profile.record('chart_render', elapsed, chart=kind, file=os.path.basename(path))
+
+    def submit(self, kind, symbol, *args, **kwargs):
+        # Les arguments sont ceux de la fonction de visualization.py correspondante, sans output_dir
+        path = chart_path(self.output_dir, kind, symbol)
+        chart_hash = input_hash(kind, symbol, *args)
+        if kind in ('price_and_indicators', 'backtest_results'):
+            args = (symbol, *args, self.output_dir)
+        else:
+            args, kwargs = (*args, self.output_dir), {**kwargs, 'symbol': symbol}
+        if self._manifest.get(os.path.basename(path)) == chart_hash and os.path.exists(path):
+            logging.debug(f'Chart {path} is up to date, skipping')
+            self.skipped += 1
+            return None
+
+        if self.max_workers == 1:
+            try:
+                elapsed = _render(kind, args, kwargs)
+                self._manifest[os.path.basename(path)] = chart_hash
+                self.rendered += 1
+                self._record(kind, path, elapsed)
+            except Exception as e:
+                logging.error(f'Error rendering {path}: {e}')
+            return None
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        future = self._executor.submit(_render, kind, args, kwargs)
+        future.add_done_callback(lambda f: self._done(kind, path, chart_hash, f))
+        return future
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._save_manifest()
+        logging.info(f'Charts rendered: {self.rendered}, unchanged and skipped: {self.skipped}')
@@ -1,6 +1,6 @@
 import logging
-import yfinance as yf
 import pandas as pd
+from bar_store import BarStore, YFinanceProvider, refresh_bars
 
 def get_etf_symbols():
     logging.info('Fetching ETF symbols using yfinance')
@@ -37,10 +37,23 @@ def get_forex_symbols():
         logging.error(f'Error fetching Forex symbols: {e}')
         return []
 
-def get_data(symbols, period="1d", interval="5m"):
-    logging.info(f'Fetching data for symbols using yfinance: {symbols}')
+def get_asset_class_requests():
+    # Classe d'actifs -> (symboles, période, intervalle)
+    return {
+        'ETF': (get_etf_symbols(), "5d", "1d"),
+        'CFD': (get_cfd_symbols(), "1d", "1m"),
+        'Forex': (get_forex_symbols(), "1mo", "1d"),
+    }
+
+def get_data(symbols, period="1d", interval="5m", store=None, provider=None, use_store=True):
+    provider = provider or YFinanceProvider()
+    logging.info(f'Fetching data for symbols using {provider.name}: {symbols}')
     try:
-        data = yf.download(symbols, period=period, interval=interval, group_by='ticker')
+        if use_store:
+            # Lire d'abord le cache local puis ne télécharger que les barres manquantes
+            data = refresh_bars(symbols, period, interval, store or BarStore(), provider)
+        else:
+            data = provider.fetch(symbols, period=period, interval=interval)
         logging.info('Data fetched successfully')
         return data
     except Exception as e:
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from indicator_engine import bar_key, default_engine
+from technical_indicators import ML_INDICATORS, MULTITEMP_INDICATORS
+
+# 'Close' en première colonne et 'Volume' juste après : la cible, les variables explicatives
+# (toutes les colonnes sauf 'Close') et le couple utilisé par le clustering sont des tranches
+# contiguës de la matrice, donc des vues sans copie.
+BASE_COLUMNS = ['Close', 'Volume', 'Open', 'High', 'Low']
+RETURN_LAGS = [1, 5, 10]
+# En dessous, la période de chauffe des indicateurs laisse trop peu de lignes : entraînement sur les barres brutes
+MIN_TRAINING_ROWS = 30
+
+
+class FeatureMatrix:
+    def __init__(self, values, columns, index):
+        self.values = values
+        self.columns = list(columns)
+        self.index = index
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+
+    @property
+    def n_rows(self):
+        return self.values.shape[0]
+
+    def column(self, name):
+        return self.values[:, self._positions[name]]
+
+    def columns_view(self, names):
+        positions = [self._positions[name] for name in names]
+        if positions == list(range(positions[0], positions[0] + len(positions))):
+            return self.values[:, positions[0]:positions[0] + len(positions)]
+        return self.values[:, positions]
+
+    def feature_names(self, target_column='Close'):
+        return [column for column in self.columns if column != target_column]
+
+    def features(self, target_column='Close'):
+        return self.columns_view(self.feature_names(target_column))
+
+    def valid_rows(self, names=None):
+        # Tranche si les lignes incomplètes ne sont qu'en début de série (période de chauffe des indicateurs)
+        values = self.values if names is None else self.columns_view(names)
+        valid = ~np.isnan(values).any(axis=1)
+        invalid = np.flatnonzero(~valid)
+        if not len(invalid):
+            return slice(0, self.n_rows)
+        if invalid[-1] == len(invalid) - 1:
+            return slice(len(invalid), self.n_rows)
+        return valid
+
+    def n_valid_rows(self, names=None):
+        rows = self.valid_rows(names)
+        return rows.stop - rows.start if isinstance(rows, slice) else int(rows.sum())
+
+    def select(self, names, valid_only=True):
+        rows = self.valid_rows(names) if valid_only else slice(0, self.n_rows)
+        return pd.DataFrame(self.columns_view(names)[rows], index=self.index[rows], columns=names, copy=False)
+
+    def to_frame(self):
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+
+def build_feature_matrix(data, symbol=None, interval=None, indicators=None, return_lags=RETURN_LAGS):
+    indicators = {**ML_INDICATORS, **MULTITEMP_INDICATORS} if indicators is None else indicators
+    close = data['Close']
+    indicator_values = default_engine.compute(close, list(indicators.values()), key=bar_key(symbol, interval, close))
+
+    base = [column for column in BASE_COLUMNS if column in data.columns]
+    columns = base + list(indicators) + [f'return_{lag}' for lag in return_lags]
+    values = np.empty((len(data.index), len(columns)), dtype=np.float32)
+    for i, column in enumerate(base):
+        values[:, i] = data[column].to_numpy(dtype=np.float32)
+    offset = len(base)
+    for i, (column, indicator) in enumerate(indicators.items()):
+        values[:, offset + i] = indicator_values[indicator].to_numpy(dtype=np.float32)
+    offset += len(indicators)
+    for i, lag in enumerate(return_lags):
+        values[:, offset + i] = (close / close.shift(lag) - 1).to_numpy(dtype=np.float32)
+    return FeatureMatrix(values, columns, data.index)
+
+
+class FeatureStore:
+    def __init__(self, max_entries=64, mmap_dir=None):
+        self.max_entries = max_entries
+        self.mmap_dir = mmap_dir
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _paths(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9_.=-]', '_', symbol)
+        base = os.path.join(self.mmap_dir, interval or 'default', safe_symbol)
+        return f"{base}.npy", f"{base}.json"
+
+    def _load_mmap(self, symbol, interval, data, meta):
+        values_path, meta_path = self._paths(symbol, interval)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as file:
+                stored = json.load(file)
+            if any(stored.get(name) != value for name, value in meta.items()):
+                return None
+            return FeatureMatrix(np.load(values_path, mmap_mode='r'), stored['columns'], data.index)
+        except Exception as e:
+            logging.error(f'Error reading feature matrix for {symbol} ({interval}): {e}')
+            return None
+
+    def _save_mmap(self, symbol, interval, matrix, meta):
+        values_path, meta_path = self._paths(symbol, interval)
+        try:
+            os.makedirs(os.path.dirname(values_path), exist_ok=True)
+            # Écriture dans un fichier temporaire : une matrice déjà mappée ne doit pas être modifiée
+            with open(f"{values_path}.tmp", 'wb') as file:
+                np.save(file, matrix.values)
+            os.replace(f"{values_path}.tmp", values_path)
+            with open(meta_path, 'w') as file:
+                json.dump(meta, file)
+        except Exception as e:
+            logging.error(f'Error saving feature matrix for {symbol} ({interval}): {e}')
+
+    def get(self, symbol, interval, data):
+        key = bar_key(symbol, interval, data)
+        if key is None:
+            # Sans symbole ni barre, rien ne permet d'identifier les données : pas de cache
+            return build_feature_matrix(data, symbol, interval)
+        with self._lock:
+            matrix = self._cache.get(key)
+            if matrix is not None:
+                self._cache.move_to_end(key)
+                return matrix
+
+        matrix = None
+        if self.mmap_dir is not None:
+            meta = {'last_index': str(key[2]), 'n_rows': key[3], 'last_row': key[4]}
+            matrix = self._load_mmap(symbol, interval, data, meta)
+        if matrix is None:
+            matrix = build_feature_matrix(data, symbol, interval)
+            if self.mmap_dir is not None:
+                self._save_mmap(symbol, interval, matrix, {**meta, 'columns': matrix.columns})
+
+        with self._lock:
+            self._cache[key] = matrix
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return matrix
+
+    def training_data(self, symbol, interval, data, min_rows=MIN_TRAINING_ROWS):
+        # Entrée commune des modèles : la matrice du magasin si elle a assez de lignes complètes
+        matrix = self.get(symbol, interval, data)
+        return matrix if matrix.n_valid_rows() >= min_rows else data
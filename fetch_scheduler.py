@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
+import pandas as pd
+from bar_store import YFinanceProvider
+from data_fetcher import get_data
+
+
+class RateLimiter:
+    def __init__(self, calls_per_second):
+        self.min_interval = 1.0 / calls_per_second if calls_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider_name, calls_per_second):
+    # Un seul limiteur par fournisseur, partagé entre tous les workers
+    with _rate_limiters_lock:
+        if provider_name not in _rate_limiters:
+            _rate_limiters[provider_name] = RateLimiter(calls_per_second)
+        return _rate_limiters[provider_name]
+
+
+def is_empty_result(data):
+    return data is None or data.empty or not data.notna().to_numpy().any()
+
+
+class ScheduledProvider:
+    def __init__(self, provider, limiter, retries=3, backoff=1.0):
+        self.provider = provider
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+
+    @property
+    def name(self):
+        return self.provider.name
+
+    def fetch(self, symbols, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                data = self.provider.fetch(symbols, **kwargs)
+                # yfinance signale la plupart des échecs par un résultat vide ou tout NaN, sans exception
+                if not is_empty_result(data) or attempt == self.retries:
+                    return data
+                error = 'empty result'
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                error = e
+            delay = self.backoff * (2 ** attempt)
+            logging.warning(f'Fetch from {self.name} failed ({error}), retrying in {delay:.1f}s')
+            time.sleep(delay)
+
+
+class FetchScheduler:
+    def __init__(self, provider=None, store=None, max_workers=4, chunk_size=None,
+                 calls_per_second=2.0, retries=3, backoff=1.0):
+        provider = provider or YFinanceProvider()
+        limiter = get_rate_limiter(provider.name, calls_per_second)
+        self.provider = ScheduledProvider(provider, limiter, retries=retries, backoff=backoff)
+        self.store = store
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def submit(self, symbols, period, interval):
+        size = self.chunk_size or len(symbols) or 1
+        chunks = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+        chunk_futures = [
+            self.executor.submit(get_data, chunk, period=period, interval=interval,
+                                 store=self.store, provider=self.provider)
+            for chunk in chunks
+        ]
+        return _gather(chunk_futures)
+
+    def run(self, requests):
+        # requests : {nom: (symboles, période, intervalle)} ; renvoie (nom, données) dans l'ordre d'arrivée
+        done = Queue()
+        for name, (symbols, period, interval) in requests.items():
+            future = self.submit(symbols, period, interval)
+            future.add_done_callback(lambda f, name=name: done.put((name, f)))
+        for _ in range(len(requests)):
+            name, future = done.get()
+            yield name, future.result()
+
+
+def _gather(chunk_futures):
+    result = Future()
+    remaining = [len(chunk_futures)]
+    lock = threading.Lock()
+
+    def on_chunk_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            frames = [f.result() for f in chunk_futures]
+            frames = [frame for frame in frames if not frame.empty]
+            result.set_result(pd.concat(frames, axis=1) if frames else pd.DataFrame())
+        except Exception as e:
+            result.set_exception(e)
+
+    if not chunk_futures:
+        result.set_result(pd.DataFrame())
+    for future in chunk_futures:
+        future.add_done_callback(on_chunk_done)
+    return result
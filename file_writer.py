@@ -1,11 +1,11 @@
 import logging
-import csv
+from report_writer import ReportWriter
 
 def write_to_csv(filename, lines):
     try:
-        with open(filename, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerows(lines)
-        logging.info(f'Results successfully written to file: {filename}')
+        # Les lignes peuvent être un générateur : elles sont écrites au fur et à mesure.
+        # Toujours du CSV, quelle que soit l'extension (trade.txt par exemple)
+        with ReportWriter(filename, format='csv') as report:
+            report.append_rows(lines)
     except Exception as e:
         logging.error(f'Error writing to file: {e}')
@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Indicateurs déclarables (clés du graphe de dépendances) :
+#   ('sma', window[, min_periods]), ('ema', span), ('rsi', period),
+#   ('macd', short, long), ('macd_signal', short, long, signal),
+#   ('bb_upper', window), ('bb_lower', window)
+# Les nœuds intermédiaires ('diff', 'gain', 'loss', moyennes et écarts-types glissants)
+# sont partagés entre les indicateurs et calculés une seule fois.
+
+
+def _dependencies(node):
+    kind = node[0]
+    if kind in ('close', 'diff'):
+        return [('close',)] if kind == 'diff' else []
+    if kind in ('gain', 'loss'):
+        return [('diff',)]
+    if kind == 'mean':
+        return [node[1]]
+    if kind == 'std':
+        return [('close',)]
+    if kind == 'ewm':
+        return [node[1]]
+    if kind == 'sma':
+        min_periods = node[2] if len(node) > 2 else None
+        return [('mean', ('close',), node[1], min_periods)]
+    if kind == 'ema':
+        return [('ewm', ('close',), node[1])]
+    if kind == 'rsi':
+        return [('mean', ('gain',), node[1], None), ('mean', ('loss',), node[1], None)]
+    if kind == 'macd':
+        return [('ewm', ('close',), node[1]), ('ewm', ('close',), node[2])]
+    if kind == 'macd_signal':
+        return [('ewm', ('macd', node[1], node[2]), node[3])]
+    if kind in ('bb_upper', 'bb_lower'):
+        return [('mean', ('close',), node[1], None), ('std', node[1])]
+    raise ValueError(f'Unknown indicator: {node}')
+
+
+def _evaluate(node, inputs):
+    kind = node[0]
+    if kind == 'diff':
+        return inputs[0].diff(1)
+    if kind == 'gain':
+        return inputs[0].where(inputs[0] > 0, 0)
+    if kind == 'loss':
+        return -inputs[0].where(inputs[0] < 0, 0)
+    if kind == 'mean':
+        return inputs[0].rolling(window=node[2], min_periods=node[3]).mean()
+    if kind == 'std':
+        return inputs[0].rolling(window=node[1]).std()
+    if kind == 'ewm':
+        return inputs[0].ewm(span=node[2], adjust=False).mean()
+    if kind in ('sma', 'ema', 'macd_signal'):
+        return inputs[0]
+    if kind == 'rsi':
+        rs = inputs[0] / inputs[1]
+        return 100 - (100 / (1 + rs))
+    if kind == 'macd':
+        return inputs[0] - inputs[1]
+    if kind == 'bb_upper':
+        return inputs[0] + (inputs[1] * 2)
+    if kind == 'bb_lower':
+        return inputs[0] - (inputs[1] * 2)
+    raise ValueError(f'Unknown indicator: {node}')
+
+
+def bar_key(symbol, interval, data):
+    # Clé de cache : dernière barre, nombre de barres et empreinte des valeurs de la dernière barre.
+    # Une barre en cours rafraîchie garde le même horodatage et la même longueur, pas les mêmes valeurs.
+    if symbol is None or not len(data.index):
+        return None
+    tail = int(pd.util.hash_pandas_object(data.iloc[-1:], index=False).iloc[0])
+    return (symbol, interval, data.index[-1], len(data.index), tail)
+
+
+class IndicatorEngine:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _nodes_for(self, key):
+        if key is None:
+            return {}
+        with self._lock:
+            nodes = self._cache.get(key)
+            if nodes is None:
+                nodes = self._cache[key] = {}
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(key)
+            return nodes
+
+    def compute(self, close, indicators, key=None):
+        nodes = self._nodes_for(key)
+        nodes[('close',)] = close
+
+        def resolve(node):
+            if node not in nodes:
+                inputs = [resolve(dep) for dep in _dependencies(node)]
+                nodes[node] = _evaluate(node, inputs)
+            return nodes[node]
+
+        return {indicator: resolve(indicator) for indicator in indicators}
+
+    def add_indicators(self, data, columns, symbol=None, interval=None):
+        # columns : {nom de colonne: indicateur}; le cache est indexé par (symbole, intervalle, dernière barre)
+        values = self.compute(data['Close'], list(columns.values()), key=bar_key(symbol, interval, data['Close']))
+        for column, indicator in columns.items():
+            data[column] = values[indicator]
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+default_engine = IndicatorEngine()
+
+
+def add_indicators(data, columns, symbol=None, interval=None):
+    return default_engine.add_indicators(data, columns, symbol=symbol, interval=interval)
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ContextDecorator
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Module Unix uniquement : sans lui, la mémoire maximale n'est pas relevée
+    resource = None
+
+# Profil d'exécution par défaut de main
+DEFAULT_PROFILE_FILE = 'run_profile.json'
+
+
+def peak_rss_mb():
+    # Mémoire résidente maximale du processus depuis son démarrage (ru_maxrss : Ko sous Linux, octets sous macOS)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StackSampler:
+    # Profileur par échantillonnage minimal : relève périodiquement la pile du thread surveillé
+    def __init__(self, interval=0.01, thread_id=None, max_depth=30):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.max_depth = max_depth
+        self.samples = 0
+        self.functions = Counter()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.thread_id = self.thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.samples += 1
+            # Temps "inclusif" : chaque fonction présente dans la pile est comptée une fois
+            self.functions.update(set(stack))
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def summary(self, top=30):
+        return {
+            'interval': self.interval,
+            'samples': self.samples,
+            'top_functions': [
+                {'function': name, 'samples': count, 'share': count / self.samples}
+                for name, count in self.functions.most_common(top)
+            ] if self.samples else [],
+            'top_stacks': [{'stack': stack, 'samples': count} for stack, count in self.stacks.most_common(top)],
+        }
+
+
+class _Stage(ContextDecorator):
+    def __init__(self, profile, name, tags):
+        self.profile = profile
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.record(self.name, time.perf_counter() - self.started, time.process_time() - self.cpu_started,
+                            failed=exc_type is not None, **self.tags)
+        return False
+
+
+class RunProfile:
+    # Temps, temps CPU, nombre d'appels et mémoire maximale par étape, plus les tâches par symbole
+    def __init__(self, sampler=None):
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = defaultdict(lambda: {'calls': 0, 'failures': 0, 'total': 0.0, 'cpu': 0.0, 'max': 0.0, 'peak_rss_mb': None})
+        self.tasks = []
+        self.counters = Counter()
+        self.sampler = sampler
+        if sampler is not None:
+            sampler.start()
+
+    def stage(self, name, **tags):
+        # Utilisable en gestionnaire de contexte (with profile.stage('fetch'):) ou en décorateur
+        return _Stage(self, name, tags)
+
+    def record(self, name, elapsed, cpu=0.0, failed=False, **tags):
+        peak = peak_rss_mb()
+        with self._lock:
+            stats = self.stages[name]
+            stats['calls'] += 1
+            stats['failures'] += int(failed)
+            stats['total'] += elapsed
+            stats['cpu'] += cpu
+            stats['max'] = max(stats['max'], elapsed)
+            stats['peak_rss_mb'] = peak
+            if tags:
+                self.tasks.append({'stage': name, 'elapsed': elapsed, 'cpu': cpu, 'failed': failed, **tags})
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def to_dict(self):
+        with self._lock:
+            stages = {
+                name: {**stats, 'mean': stats['total'] / stats['calls'] if stats['calls'] else 0.0}
+                for name, stats in self.stages.items()
+            }
+            report = {
+                'started_at': self.started_at.isoformat(),
+                'wall_time': time.perf_counter() - self._started,
+                'cpu_time': time.process_time(),
+                'peak_rss_mb': peak_rss_mb(),
+                'stages': dict(sorted(stages.items(), key=lambda item: -item[1]['total'])),
+                'tasks': list(self.tasks),
+                'counters': dict(self.counters),
+            }
+        if self.sampler is not None:
+            report['sampling'] = self.sampler.summary()
+        return report
+
+    def write(self, path=DEFAULT_PROFILE_FILE):
+        if self.sampler is not None:
+            self.sampler.stop()
+        report = self.to_dict()
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(report, file, indent=2, default=str)
+            os.replace(tmp_path, path)
+            logging.info(f'Run profile written to {path}')
+        except Exception as e:
+            logging.error(f'Error writing run profile {path}: {e}')
+        return report
+
+    def log_summary(self, top=10):
+        for name, stats in list(self.to_dict()['stages'].items())[:top]:
+            logging.info(f"Stage {name}: {stats['total']:.3f}s over {stats['calls']} calls (max {stats['max']:.3f}s)")
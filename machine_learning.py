@@ -1,55 +1,165 @@
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import mean_squared_error, silhouette_score
 from sklearn.ensemble import RandomForestRegressor
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-import matplotlib.pyplot as plt
+from sentiment import get_analyzer, score_headlines
+from feature_store import FeatureMatrix
+from technical_indicators import add_ml_indicators, add_multitemp_indicators
 
-# Configuration de la journalisation
-logging.basicConfig(filename='trade.log', level=logging.DEBUG, format='%(asctime)s %(levelname)s: %(message)s')
+# Nombre d'arbres ajoutés lors d'un réentraînement incrémental de la forêt aléatoire
+RF_WARM_START_TREES = 20
+RF_MAX_TREES = 300
+
+def _split_target(data, target_column):
+    # Une FeatureMatrix fournit des vues sur sa matrice float32 au lieu de copier le DataFrame
+    if isinstance(data, FeatureMatrix):
+        rows = data.valid_rows()
+        return data.features(target_column)[rows], pd.Series(data.column(target_column)[rows], index=data.index[rows], copy=False)
+    return data.drop(columns=[target_column]), data[target_column]
+
+def _split_train_test(data, target_column):
+    X, y = _split_target(data, target_column)
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def _test_frame(data, X_test, y_test, target_column):
+    # Les résultats gardent un X_test indexé (utilisé par plot_regression_results)
+    if isinstance(data, FeatureMatrix):
+        return pd.DataFrame(X_test, index=y_test.index, columns=data.feature_names(target_column), copy=False)
+    return X_test
+
+def _cached_result(registry, symbol, model_name, data, target_column):
+    if registry is None or symbol is None:
+        return 'miss', None
+    status, entry = registry.lookup(symbol, model_name, data, target_column)
+    if status == 'hit':
+        logging.info(f"Reusing cached {model_name} model for {symbol}")
+    return status, entry
 
 # Modèle de régression linéaire
-def train_regression_model(data, target_column):
+def train_regression_model(data, target_column, symbol=None, registry=None):
     logging.info("Training regression model")
     try:
-        X = data.drop(columns=[target_column])
-        y = data[target_column]
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        status, entry = _cached_result(registry, symbol, 'regression', data, target_column)
+        if status == 'hit':
+            return entry['result']
+        X_train, X_test, y_train, y_test = _split_train_test(data, target_column)
         model = LinearRegression()
         model.fit(X_train, y_train)
         y_pred = model.predict(X_test)
         mse = mean_squared_error(y_test, y_pred)
         logging.info(f"Regression model trained with MSE: {mse}")
-        return model, mse, X_test, y_test, y_pred
+        result = (model, mse, _test_frame(data, X_test, y_test, target_column), y_test, y_pred)
+        if registry is not None and symbol is not None:
+            registry.store(symbol, 'regression', data, target_column, model, result)
+        return result
     except Exception as e:
         logging.error(f"Error training regression model: {e}")
         return None, None, None, None, None
 
 # Modèle de forêt aléatoire
-def train_random_forest_model(data, target_column):
+def train_random_forest_model(data, target_column, symbol=None, registry=None, n_jobs=None):
     logging.info("Training random forest model")
     try:
-        X = data.drop(columns=[target_column])
-        y = data[target_column]
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
+        status, entry = _cached_result(registry, symbol, 'random_forest', data, target_column)
+        if status == 'hit':
+            return entry['result']
+        if status == 'append' and entry['model'].n_estimators + RF_WARM_START_TREES <= RF_MAX_TREES:
+            # Seules de nouvelles barres ont été ajoutées : on complète la forêt existante. Les anciens
+            # arbres ont pu voir n'importe quelle ligne déjà stockée ; le MSE est donc mesuré sur les seules
+            # barres ajoutées, prédites par la forêt stockée avant qu'elle ne les voie.
+            model = entry['model']
+            X, y = _split_target(data, target_column)
+            appended = (y.index > entry['index'][-1]).nonzero()[0]
+            X_test, y_test = (X.iloc[appended] if hasattr(X, 'iloc') else X[appended]), y.iloc[appended]
+            y_pred = model.predict(X_test)
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + RF_WARM_START_TREES, n_jobs=n_jobs)
+            logging.info(f"Warm-starting random forest for {symbol} with {RF_WARM_START_TREES} new trees")
+            model.fit(X, y)
+        else:
+            X_train, X_test, y_train, y_test = _split_train_test(data, target_column)
+            model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+            model.fit(X_train, y_train)
+            y_pred = model.predict(X_test)
         mse = mean_squared_error(y_test, y_pred)
         logging.info(f"Random forest model trained with MSE: {mse}")
-        return model, mse, X_test, y_test, y_pred
+        result = (model, mse, _test_frame(data, X_test, y_test, target_column), y_test, y_pred)
+        if registry is not None and symbol is not None:
+            registry.store(symbol, 'random_forest', data, target_column, model, result)
+        return result
     except Exception as e:
         logging.error(f"Error training random forest model: {e}")
         return None, None, None, None, None
 
+MODEL_TRAINERS = {
+    'regression': train_regression_model,
+    'random_forest': train_random_forest_model,
+}
+
+def _train_symbol(symbol, data, target_column, models, registry, rf_n_jobs):
+    results = {}
+    for model_name in models:
+        if model_name == 'random_forest':
+            results[model_name] = train_random_forest_model(data, target_column, symbol, registry, n_jobs=rf_n_jobs)
+        else:
+            results[model_name] = MODEL_TRAINERS[model_name](data, target_column, symbol, registry)
+    return symbol, results
+
+def batch_pool_sizes(n_symbols, max_workers=None):
+    # Répartit les cœurs entre processus (un par symbole) et n_jobs de la forêt aléatoire
+    cores = max_workers or os.cpu_count() or 1
+    workers = max(1, min(cores, n_symbols))
+    rf_n_jobs = max(1, cores // workers)
+    return workers, rf_n_jobs
+
+def _collect_batch(executor, frames, target_column, models, registry, rf_n_jobs, results):
+    futures = {
+        symbol: executor.submit(_train_symbol, symbol, data, target_column, models, registry, rf_n_jobs)
+        for symbol, data in frames.items()
+    }
+    # Une erreur (ou un worker tué) ne fait perdre que les résultats de son symbole
+    for symbol, future in futures.items():
+        try:
+            results[symbol] = future.result()[1]
+        except Exception as e:
+            logging.error(f"Error training models for {symbol}: {e}")
+
+# Entraînement en lot sur plusieurs symboles ; `executor` permet de réutiliser un pool existant
+def train_models_batch(frames, target_column='Close', models=('regression', 'random_forest'), registry=None, max_workers=None, executor=None):
+    logging.info(f"Training {', '.join(models)} models for {len(frames)} symbols")
+    results = {}
+    if not frames:
+        return results
+    workers, rf_n_jobs = batch_pool_sizes(len(frames), max_workers)
+    try:
+        if workers == 1:
+            for symbol, data in frames.items():
+                try:
+                    results[symbol] = _train_symbol(symbol, data, target_column, models, registry, rf_n_jobs)[1]
+                except Exception as e:
+                    logging.error(f"Error training models for {symbol}: {e}")
+        elif executor is not None:
+            _collect_batch(executor, frames, target_column, models, registry, rf_n_jobs, results)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                _collect_batch(executor, frames, target_column, models, registry, rf_n_jobs, results)
+    except Exception as e:
+        logging.error(f"Error in batch training: {e}")
+    # Les symboles en échec renvoient le même résultat vide que train_*_model
+    for symbol in frames:
+        results.setdefault(symbol, {model_name: (None, None, None, None, None) for model_name in models})
+    return results
+
 # Prédiction des prix
-def predict_price(model, data):
+def predict_price(model, data, target_column='Close'):
     logging.info("Predicting prices")
     try:
+        if isinstance(data, FeatureMatrix):
+            data = data.features(target_column)
         predictions = model.predict(data)
         logging.info(f"Predictions: {predictions}")
         return predictions
@@ -57,19 +167,55 @@ def predict_price(model, data):
         logging.error(f"Error predicting prices: {e}")
         return None
 
+# Au-delà de cette taille, le score silhouette (O(n²)) est estimé sur un échantillon
+SILHOUETTE_SAMPLE_SIZE = 10000
+
+def _clustering_estimator(n_clusters, mode, batch_size):
+    if mode == 'minibatch':
+        return MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=42, n_init=3)
+    return KMeans(n_clusters=n_clusters, random_state=42)
+
+def _fit_clustering(data, n_clusters, mode, batch_size, silhouette_sample):
+    model = _clustering_estimator(n_clusters, mode, batch_size)
+    clusters = model.fit_predict(data)
+    sample_size = silhouette_sample if silhouette_sample and silhouette_sample < len(clusters) else None
+    silhouette_avg = silhouette_score(data, clusters, sample_size=sample_size, random_state=42)
+    return model, silhouette_avg, clusters
+
 # Modèle de clustering
-def train_clustering_model(data, n_clusters):
+def train_clustering_model(data, n_clusters, mode='full', batch_size=1024, silhouette_sample=SILHOUETTE_SAMPLE_SIZE, max_workers=None):
+    # n_clusters peut être une liste de candidats : le meilleur score silhouette l'emporte
     logging.info("Training clustering model")
     try:
-        model = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = model.fit_predict(data)
-        silhouette_avg = silhouette_score(data, clusters)
+        if isinstance(data, FeatureMatrix):
+            data = data.select(['Close', 'Volume'])
+        candidates = list(n_clusters) if isinstance(n_clusters, (list, tuple, range)) else [n_clusters]
+        if len(candidates) == 1:
+            model, silhouette_avg, clusters = _fit_clustering(data, candidates[0], mode, batch_size, silhouette_sample)
+        else:
+            # Les ajustements KMeans libèrent le GIL : un pool de threads suffit à les paralléliser
+            with ThreadPoolExecutor(max_workers=max_workers or min(len(candidates), os.cpu_count() or 1)) as executor:
+                fits = list(executor.map(lambda k: _fit_clustering(data, k, mode, batch_size, silhouette_sample), candidates))
+            model, silhouette_avg, clusters = max(fits, key=lambda fit: fit[1])
+            logging.info(f"Selected {model.n_clusters} clusters among {candidates}")
         logging.info(f"Clustering model trained with silhouette score: {silhouette_avg}")
         return model, silhouette_avg, clusters
     except Exception as e:
         logging.error(f"Error training clustering model: {e}")
         return None, None, None
 
+# Mise à jour incrémentale d'un modèle MiniBatchKMeans avec de nouvelles barres
+def update_clustering_model(model, data):
+    logging.info("Updating clustering model")
+    try:
+        if isinstance(data, FeatureMatrix):
+            data = data.select(['Close', 'Volume'])
+        model.partial_fit(data)
+        return model
+    except Exception as e:
+        logging.error(f"Error updating clustering model: {e}")
+        return None
+
 # Clustering des données
 def cluster_data(model, data):
     logging.info("Clustering data")
@@ -83,6 +229,7 @@ def cluster_data(model, data):
 
 # Visualisation des résultats de la régression
 def plot_regression_results(X_test, y_test, y_pred, output_dir):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.scatter(X_test.index, y_test, color='blue', label='Actual')
     plt.scatter(X_test.index, y_pred, color='red', label='Predicted')
@@ -95,6 +242,7 @@ def plot_regression_results(X_test, y_test, y_pred, output_dir):
 
 # Visualisation des résultats de clustering
 def plot_clustering_results(data, clusters, output_dir):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.scatter(data.iloc[:, 0], data.iloc[:, 1], c=clusters, cmap='viridis', marker='o')
     plt.xlabel('Feature 1')
@@ -105,45 +253,20 @@ def plot_clustering_results(data, clusters, output_dir):
 
 # Analyse des sentiments
 def analyze_sentiment(text):
-    analyzer = SentimentIntensityAnalyzer()
-    sentiment_score = analyzer.polarity_scores(text)['compound']
+    sentiment_score = get_analyzer().polarity_scores(text)['compound']
     return sentiment_score
 
+def analyze_sentiment_batch(texts, cache=None, max_workers=None):
+    return score_headlines(texts, cache=cache, max_workers=max_workers)
+
 # Ajout des indicateurs techniques
-def add_technical_indicators(data):
-    data['SMA'] = data['Close'].rolling(window=20).mean()
-    data['EMA'] = data['Close'].ewm(span=20, adjust=False).mean()
-    data['RSI'] = calculate_rsi(data['Close'])
-    data['Upper_BB'], data['Lower_BB'] = calculate_bollinger_bands(data['Close'])
-    data = add_multitemp_indicators(data)
-    return data
-
-def calculate_rsi(series, period=14):
-    delta = series.diff(1)
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_bollinger_bands(close, window=20):
-    sma = close.rolling(window).mean()
-    std = close.rolling(window).std()
-    upper_bb = sma + (std * 2)
-    lower_bb = sma - (std * 2)
-    return upper_bb, lower_bb
-
-def add_multitemp_indicators(data):
-    windows = [5, 10, 20]  # Short, medium, long term windows
-    for window in windows:
-        data[f'SMA_{window}'] = calculate_moving_average(data, window)
-        data[f'RSI_{window}'] = calculate_rsi(data['Close'], window)
-    return data
-
-def calculate_moving_average(data, window):
-    return data['Close'].rolling(window=window).mean()
+def add_technical_indicators(data, symbol=None, interval=None):
+    return add_ml_indicators(data, symbol=symbol, interval=interval)
 
 # Exemple d'utilisation
 if __name__ == "__main__":
+    logging.basicConfig(filename='trade.log', level=logging.DEBUG, format='%(asctime)s %(levelname)s: %(message)s')
+
     # Exemples de données
     data = pd.DataFrame({
         'Close': [150, 152, 153, 155, 154, 156],
@@ -163,7 +286,7 @@ if __name__ == "__main__":
     data = add_multitemp_indicators(data)
 
     # Analyse des sentiments
-    data['Sentiment'] = data['News'].apply(analyze_sentiment)
+    data['Sentiment'] = analyze_sentiment_batch(data['News'].tolist())
 
     # Entraînement des modèles
     target_column = 'Close'
@@ -1,35 +1,44 @@
+import argparse
 import logging
 import os
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill
-from data_fetcher import get_etf_symbols, get_cfd_symbols, get_forex_symbols, get_data
-from movers_calculator import get_top_movers
-from analyzer import analyze_data, analyze_movement, estimate_max_profit, calculate_tp, estimate_duration
-from technical_indicators import add_technical_indicators
-from visualization import plot_price_and_indicators, plot_backtest_results, plot_regression_results, plot_clustering_results
-from backtesting import backtest_strategy, simple_moving_average_strategy, simple_strategy, rsi_strategy, write_backtest_log
-from machine_learning import train_regression_model, train_random_forest_model, predict_price, train_clustering_model, cluster_data
-
-# Configuration de la journalisation
-logging.basicConfig(filename='trade.log', level=logging.DEBUG, format='%(asctime)s %(levelname)s: %(message)s', filemode='w')
-
-# Fichiers à supprimer
+import numpy as np
+import pandas as pd
+from data_fetcher import get_asset_class_requests
+from fetch_scheduler import FetchScheduler
+from movers_calculator import MOVER_METRICS, get_top_movers
+from analysis_engine import SECTIONS, build_analysis_table, reliability_scores, risk_levels, score_candidates
+from results_store import ResultsStore
+from instrumentation import DEFAULT_PROFILE_FILE, RunProfile, StackSampler
+
+# Les modules lourds (scikit-learn, matplotlib, openpyxl, yfinance) ne sont importés que par
+# les commandes qui en ont besoin, et l'import de ce module n'a aucun effet de bord.
+
+# Fichiers de sortie, recréés à chaque exécution complète
 log_file = 'trade.log'
 excel_file = 'trade.xlsx'
 backtest_log_file = 'backtest_log.txt'
 
-# Supprimer les fichiers s'ils existent
-if os.path.exists(log_file):
-    os.remove(log_file)
-if os.path.exists(excel_file):
-    os.remove(excel_file)
-if os.path.exists(backtest_log_file):
-    os.remove(backtest_log_file)
+# Colonnes du rapport Excel
+report_header = ["Category", "Symbol", "Percent Change", "Action", "TP", "Max Profit", "Duration", "Predicted Price (Reg)", "Predicted Price (RF)", "Stop Loss", "Take Profit", "Comments", "Reliability"]
 
-# Créer le répertoire de sortie pour les graphiques
+# Répertoire de sortie pour les graphiques
 output_dir = "plots"
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+
+STRATEGIES = ['sma', 'simple', 'rsi']
+
+def setup_logging(filename=log_file, level=logging.DEBUG):
+    # filemode='w' : le journal repart de zéro à chaque exécution
+    logging.basicConfig(filename=filename, level=level, format='%(asctime)s %(levelname)s: %(message)s', filemode='w')
+
+def reset_outputs(*files):
+    # Supprimer les fichiers s'ils existent
+    for filename in files:
+        if os.path.exists(filename):
+            os.remove(filename)
+
+def ensure_output_dir():
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
 
 def check_close_column(data, symbols):
     missing_close = []
@@ -42,335 +51,404 @@ def check_close_column(data, symbols):
     return missing_close
 
 def calculate_risk_management(data, action, capital=10000, risk_per_trade=0.01):
-    stop_loss_pct = 0.02  # 2% du prix actuel
-    take_profit_pct = 0.04  # 4% du prix actuel
-    current_price = data['Close'].iloc[-1]
-
-    if action == 'buy':
-        stop_loss_price = current_price * (1 - stop_loss_pct)
-        take_profit_price = current_price * (1 + take_profit_pct)
-    elif action == 'short':
-        stop_loss_price = current_price * (1 + stop_loss_pct)
-        take_profit_price = current_price * (1 - take_profit_pct)
-    else:
-        stop_loss_price = current_price
-        take_profit_price = current_price
-
-    # Éviter la division par zéro
-    if current_price == stop_loss_price:
-        position_size = 0
-    else:
-        position_size = (capital * risk_per_trade) / abs(current_price - stop_loss_price)
-
-    return position_size, stop_loss_price, take_profit_price
+    position_size, stop_loss_price, take_profit_price = risk_levels([data['Close'].iloc[-1]], [action], capital, risk_per_trade)
+    return position_size[0], stop_loss_price[0], take_profit_price[0]
 
 def write_to_excel(filename, data):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Trade Data"
-
-    for row in data:
-        ws.append(row)
-
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in row:
-            if isinstance(cell.value, str):
-                if "Gainer" in cell.value:
-                    cell.fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-                elif "Loser" in cell.value:
-                    cell.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-
-    wb.save(filename)
+    from report_writer import ReportWriter
+    rows = iter(data)
+    with ReportWriter(filename, header=next(rows, None)) as report:
+        report.append_rows(rows)
 
 def evaluate_reliability(reg_pred, rf_pred, action, tp):
-    if action == "buy" and reg_pred > tp and rf_pred > tp:
-        return "High Confidence"
-    elif action == "short" and reg_pred < tp and rf_pred < tp:
-        return "High Confidence"
-    else:
-        return "Low Confidence"
-
-def main():
+    return str(reliability_scores([reg_pred], [rf_pred], [action], [tp])[0])
+
+def fetch_asset_classes(asset_classes=None, profile=None, k=5, metric='change', verbose=True, on_arrival=None):
+    # Récupérer les données des classes d'actifs en parallèle et calculer leurs top movers ;
+    # on_arrival(classe, données, movers) est appelé dès qu'une classe arrive, pendant que les autres se téléchargent
+    profile = profile or RunProfile()
+    fetch_requests = get_asset_class_requests()
+    if asset_classes:
+        fetch_requests = {name: request for name, request in fetch_requests.items() if name in asset_classes}
+    data_by_class, movers_by_class = {}, {}
+    with FetchScheduler() as scheduler:
+        arrivals = scheduler.run(fetch_requests)
+        while True:
+            # L'étape 'fetch' ne mesure que l'attente des données, pas le traitement des classes déjà arrivées
+            with profile.stage('fetch'):
+                arrival = next(arrivals, None)
+            if arrival is None:
+                break
+            # Chaque classe d'actifs est traitée dès que ses données arrivent
+            asset_class, class_data = arrival
+            logging.debug(f'{asset_class} Data: {class_data.head()}')
+            profile.count('symbols_fetched', len(fetch_requests[asset_class][0]))
+            with profile.stage('movers', asset_class=asset_class):
+                top_gainers, top_losers = get_top_movers(class_data, k=k, metric=metric)
+            missing_close = check_close_column(class_data, fetch_requests[asset_class][0])
+            if missing_close:
+                raise ValueError(f"Column 'Close' not found in {asset_class} data for symbols: {missing_close}")
+            logging.debug(f'Top Gainers {asset_class}: {top_gainers}')
+            logging.debug(f'Top Losers {asset_class}: {top_losers}')
+            if verbose:
+                print(f'Top Gainers {asset_class}: {top_gainers}')
+                print(f'Top Losers {asset_class}: {top_losers}')
+            data_by_class[asset_class] = class_data
+            movers_by_class[asset_class] = (top_gainers, top_losers)
+            if on_arrival is not None:
+                on_arrival(asset_class, class_data, (top_gainers, top_losers))
+    return fetch_requests, data_by_class, movers_by_class
+
+def training_frames_for(analysis, data_by_class, feature_store=None, interval=None):
+    # Avec un magasin de variables, chaque symbole est entraîné sur sa matrice (construite une fois par dernière barre)
+    if feature_store is None:
+        return {row.symbol: data_by_class[row.asset_class][row.symbol] for row in analysis.itertuples()}
+    return {row.symbol: feature_store.training_data(row.symbol, interval, data_by_class[row.asset_class][row.symbol])
+            for row in analysis.itertuples()}
+
+def forecast(validations, symbol, model_name):
+    # Prévision walk-forward de la prochaine clôture (entraînée sur tout l'historique, sans mélange)
+    result = validations[symbol][model_name]
+    return result['forecast'] if result is not None and result['forecast'] is not None else np.nan
+
+def validation_mse(validations, symbol, model_name):
+    result = validations[symbol][model_name]
+    return result['mse'] if result is not None else np.nan
+
+def score_trained_candidates(analysis, validations):
+    # Stop loss, take profit et fiabilité de tous les candidats en une passe
+    return score_candidates(
+        analysis,
+        [forecast(validations, symbol, 'regression') for symbol in analysis['symbol']],
+        [forecast(validations, symbol, 'random_forest') for symbol in analysis['symbol']],
+    )
+
+def analyze_asset_class(asset_class, class_data, movers, registry=None, profile=None, feature_store=None, interval=None):
+    from walk_forward import walk_forward_batch
+    profile = profile or RunProfile()
+    with profile.stage('analysis', asset_class=asset_class):
+        analysis = build_analysis_table({asset_class: class_data}, {asset_class: movers})
+    # Validation walk-forward des modèles des top movers : prévisions et MSE hors échantillon
+    with profile.stage('features', asset_class=asset_class):
+        training_frames = training_frames_for(analysis, {asset_class: class_data}, feature_store, interval)
+    with profile.stage('training', asset_class=asset_class):
+        validations = walk_forward_batch(training_frames, 'Close', registry=registry)
+    profile.count('models_trained', 2 * len(training_frames))
+    with profile.stage('scoring', asset_class=asset_class):
+        scored = score_trained_candidates(analysis, validations)
+    return analysis, training_frames, validations, scored
+
+def analyze_asset_classes(asset_classes=None, profile=None, registry=None, verbose=True, feature_store=None):
+    # Chaque classe d'actifs est analysée, validée et notée dès que ses données arrivent
+    per_class = {}
+    intervals = {asset_class: request[2] for asset_class, request in get_asset_class_requests().items()}
+
+    def on_arrival(asset_class, class_data, movers):
+        per_class[asset_class] = analyze_asset_class(asset_class, class_data, movers, registry, profile,
+                                                     feature_store, intervals[asset_class])
+
+    fetch_requests, data_by_class, _ = fetch_asset_classes(asset_classes, profile=profile, verbose=verbose, on_arrival=on_arrival)
+    # Tables réassemblées dans l'ordre des sections du rapport
+    order = [asset_class for asset_class in dict.fromkeys(section[0] for section in SECTIONS) if asset_class in per_class]
+    analysis = pd.concat([per_class[asset_class][0] for asset_class in order], ignore_index=True)
+    scored = pd.concat([per_class[asset_class][3] for asset_class in order], ignore_index=True)
+    training_frames, validations = {}, {}
+    for asset_class in order:
+        training_frames.update(per_class[asset_class][1])
+        validations.update(per_class[asset_class][2])
+    return fetch_requests, data_by_class, analysis, training_frames, validations, scored
+
+def write_report(scored, filename=excel_file):
+    from report_writer import ReportWriter
+    # Écrire les résultats au fur et à mesure, section par section
+    with ReportWriter(filename, header=report_header) as report:
+        for asset_class, kind, title in SECTIONS:
+            report.append([title])
+            for row in scored[scored['section'] == title].itertuples():
+                reg_pred_price = "N/A" if np.isnan(row.reg_pred) else row.reg_pred
+                rf_pred_price = "N/A" if np.isnan(row.rf_pred) else row.rf_pred
+                report.append([f"{asset_class} {kind}", row.symbol, f"{row.change:.2f}", row.action, f"{row.tp:.2f}", f"{row.max_profit:.2f}", f"{row.duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{row.stop_loss:.2f}", f"{row.take_profit:.2f}", row.comments, row.reliability])
+
+def record_predictions(results_store, run_id, training_frames, validations):
+    results_store.record_predictions(run_id, [
+        (symbol, model_name, training_frames[symbol].index[-1], forecast(validations, symbol, model_name), validation_mse(validations, symbol, model_name))
+        for symbol in validations for model_name in ('regression', 'random_forest')
+    ])
+
+def main(profile_file=DEFAULT_PROFILE_FILE, sample_interval=None):
+    from technical_indicators import add_technical_indicators
+    from chart_renderer import ChartRenderer
+    from backtesting import backtest_strategy, backtest_portfolio, portfolio_matrices, simple_moving_average_strategy, simple_strategy, rsi_strategy, write_backtest_log
+    from model_registry import ModelRegistry
+    from feature_store import FeatureStore
+    from machine_learning import train_clustering_model
+    from walk_forward import walk_forward_validate
+
+    reset_outputs(excel_file, backtest_log_file)
+    ensure_output_dir()
     logging.info('Starting main script')
     print('Starting main script')
+    # Temps et mémoire par étape, écrits en JSON à la fin de l'exécution
+    profile = RunProfile(sampler=StackSampler(sample_interval) if sample_interval else None)
+    # Les résultats de chaque exécution sont conservés dans la base SQLite, contrairement aux fichiers ci-dessus
+    results_store = ResultsStore()
+    run_id = results_store.start_run()
     try:
-        # Récupérer les symboles et les données pour les ETF
-        etf_symbols = get_etf_symbols()
-        etf_data = get_data(etf_symbols, period="5d", interval="1d")
-        logging.debug(f'ETF Data: {etf_data.head()}')
-        print(f'ETF Data: {etf_data.head()}')
-        top_gainers_etf, top_losers_etf = get_top_movers(etf_data)
-        missing_close_etf = check_close_column(etf_data, etf_symbols)
-        if missing_close_etf:
-            raise ValueError(f"Column 'Close' not found in ETF data for symbols: {missing_close_etf}")
-
-        # Récupérer les symboles et les données pour les CFD
-        cfd_symbols = get_cfd_symbols()
-        cfd_data = get_data(cfd_symbols, period="1d", interval="1m")
-        logging.debug(f'CFD Data: {cfd_data.head()}')
-        print(f'CFD Data: {cfd_data.head()}')
-        top_gainers_cfd, top_losers_cfd = get_top_movers(cfd_data)
-        missing_close_cfd = check_close_column(cfd_data, cfd_symbols)
-        if missing_close_cfd:
-            raise ValueError(f"Column 'Close' not found in CFD data for symbols: {missing_close_cfd}")
-
-        # Journalisation pour CFD
-        logging.debug(f'Top Gainers CFDs: {top_gainers_cfd}')
-        print(f'Top Gainers CFDs: {top_gainers_cfd}')
-        logging.debug(f'Top Losers CFDs: {top_losers_cfd}')
-        print(f'Top Losers CFDs: {top_losers_cfd}')
-
-        # Récupérer les symboles et les données pour les paires Forex
-        forex_symbols = get_forex_symbols()
-        forex_data = get_data(forex_symbols, period="1mo", interval="1d")
-        logging.debug(f'Forex Data: {forex_data.head()}')
-        print(f'Forex Data: {forex_data.head()}')
-        top_gainers_forex, top_losers_forex = get_top_movers(forex_data)
-        missing_close_forex = check_close_column(forex_data, forex_symbols)
-        if missing_close_forex:
-            raise ValueError(f"Column 'Close' not found in Forex data for symbols: {missing_close_forex}")
-
-        # Analyser les données et ajouter les indicateurs techniques
+        # Les modèles déjà entraînés sur les mêmes données sont réutilisés
+        model_registry = ModelRegistry()
+        feature_store = FeatureStore()
+
+        # Récupérer les données des trois classes d'actifs en parallèle ; l'analyse (remplissage,
+        # rendements, TP et durée), la validation walk-forward et la notation de chaque classe
+        # démarrent dès l'arrivée de ses données, pendant que les autres se téléchargent
         logging.info("Analyzing data and adding technical indicators")
         print("Analyzing data and adding technical indicators")
-        results = analyze_data(top_gainers_etf, top_losers_etf, etf_data, top_gainers_cfd, top_losers_cfd, cfd_data, top_gainers_forex, top_losers_forex, forex_data)
-        
-        # Préparer les résultats au format Excel
-        excel_lines = [["Category", "Symbol", "Percent Change", "Action", "TP", "Max Profit", "Duration", "Predicted Price (Reg)", "Predicted Price (RF)", "Stop Loss", "Take Profit", "Comments", "Reliability"]]
-        excel_lines += [["Top Gainers ETFs (5 Days)"]]
-        for item in top_gainers_etf:
-            symbol, change = item
-            action = analyze_movement(float(change))
-            max_profit = estimate_max_profit(symbol, etf_data)
-            tp = calculate_tp(symbol, etf_data, action)
-            duration = estimate_duration(symbol, etf_data, action)
-            
-            # Prédiction du prix avec les modèles de régression
-            reg_model, reg_mse, X_test, y_test, reg_pred = train_regression_model(etf_data[symbol], 'Close')
-            rf_model, rf_mse, X_test, y_test, rf_pred = train_random_forest_model(etf_data[symbol], 'Close')
-            reg_pred_price = reg_pred[-1] if reg_pred is not None else "N/A"
-            rf_pred_price = rf_pred[-1] if rf_pred is not None else "N/A"
-            
-            # Calcul du stop loss et du take profit
-            position_size, stop_loss_price, take_profit_price = calculate_risk_management(etf_data[symbol], action)
-            
-            comments = "Consistent" if action == "buy" and reg_pred_price > tp and rf_pred_price > tp else "Contradictory"
-            reliability = evaluate_reliability(reg_pred_price, rf_pred_price, action, tp)
-            
-            excel_lines.append(["ETF Gainer", symbol, f"{change:.2f}", action, f"{tp:.2f}", f"{max_profit:.2f}", f"{duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{stop_loss_price:.2f}", f"{take_profit_price:.2f}", comments, reliability])
-
-        excel_lines += [["Top Losers ETFs (5 Days)"]]
-        for item in top_losers_etf:
-            symbol, change = item
-            action = analyze_movement(float(change))
-            max_profit = estimate_max_profit(symbol, etf_data)
-            tp = calculate_tp(symbol, etf_data, action)
-            duration = estimate_duration(symbol, etf_data, action)
-            
-            # Prédiction du prix avec les modèles de régression
-            reg_model, reg_mse, X_test, y_test, reg_pred = train_regression_model(etf_data[symbol], 'Close')
-            rf_model, rf_mse, X_test, y_test, rf_pred = train_random_forest_model(etf_data[symbol], 'Close')
-            reg_pred_price = reg_pred[-1] if reg_pred is not None else "N/A"
-            rf_pred_price = rf_pred[-1] if rf_pred is not None else "N/A"
-            
-            # Calcul du stop loss et du take profit
-            position_size, stop_loss_price, take_profit_price = calculate_risk_management(etf_data[symbol], action)
-            
-            comments = "Consistent" if action == "short" and reg_pred_price < tp and rf_pred_price < tp else "Contradictory"
-            reliability = evaluate_reliability(reg_pred_price, rf_pred_price, action, tp)
-            
-            excel_lines.append(["ETF Loser", symbol, f"{change:.2f}", action, f"{tp:.2f}", f"{max_profit:.2f}", f"{duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{stop_loss_price:.2f}", f"{take_profit_price:.2f}", comments, reliability])
-
-        excel_lines += [["Top Gainers CFDs (Last Day)"]]
-        for item in top_gainers_cfd:
-            symbol, change = item
-            action = analyze_movement(float(change))
-            max_profit = estimate_max_profit(symbol, cfd_data)
-            tp = calculate_tp(symbol, cfd_data, action)
-            duration = estimate_duration(symbol, cfd_data, action)
-            
-            # Prédiction du prix avec les modèles de régression
-            reg_model, reg_mse, X_test, y_test, reg_pred = train_regression_model(cfd_data[symbol], 'Close')
-            rf_model, rf_mse, X_test, y_test, rf_pred = train_random_forest_model(cfd_data[symbol], 'Close')
-            reg_pred_price = reg_pred[-1] if reg_pred is not None else "N/A"
-            rf_pred_price = rf_pred[-1] if rf_pred is not None else "N/A"
-            
-            # Calcul du stop loss et du take profit
-            position_size, stop_loss_price, take_profit_price = calculate_risk_management(cfd_data[symbol], action)
-            
-            comments = "Consistent" if action == "buy" and reg_pred_price > tp and rf_pred_price > tp else "Contradictory"
-            reliability = evaluate_reliability(reg_pred_price, rf_pred_price, action, tp)
-            
-            excel_lines.append(["CFD Gainer", symbol, f"{change:.2f}", action, f"{tp:.2f}", f"{max_profit:.2f}", f"{duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{stop_loss_price:.2f}", f"{take_profit_price:.2f}", comments, reliability])
-
-        excel_lines += [["Top Losers CFDs (Last Day)"]]
-        for item in top_losers_cfd:
-            symbol, change = item
-            action = analyze_movement(float(change))
-            max_profit = estimate_max_profit(symbol, cfd_data)
-            tp = calculate_tp(symbol, cfd_data, action)
-            duration = estimate_duration(symbol, cfd_data, action)
-            
-            # Prédiction du prix avec les modèles de régression
-            reg_model, reg_mse, X_test, y_test, reg_pred = train_regression_model(cfd_data[symbol], 'Close')
-            rf_model, rf_mse, X_test, y_test, rf_pred = train_random_forest_model(cfd_data[symbol], 'Close')
-            reg_pred_price = reg_pred[-1] if reg_pred is not None else "N/A"
-            rf_pred_price = rf_pred[-1] if rf_pred is not None else "N/A"
-            
-            # Calcul du stop loss et du take profit
-            position_size, stop_loss_price, take_profit_price = calculate_risk_management(cfd_data[symbol], action)
-            
-            comments = "Consistent" if action == "short" and reg_pred_price < tp and rf_pred_price < tp else "Contradictory"
-            reliability = evaluate_reliability(reg_pred_price, rf_pred_price, action, tp)
-            
-            excel_lines.append(["CFD Loser", symbol, f"{change:.2f}", action, f"{tp:.2f}", f"{max_profit:.2f}", f"{duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{stop_loss_price:.2f}", f"{take_profit_price:.2f}", comments, reliability])
-
-        excel_lines += [["Top Gainers Forex Pairs (Last Day)"]]
-        for item in top_gainers_forex:
-            symbol, change = item
-            action = analyze_movement(float(change))
-            max_profit = estimate_max_profit(symbol, forex_data)
-            tp = calculate_tp(symbol, forex_data, action)
-            duration = estimate_duration(symbol, forex_data, action)
-            
-            # Prédiction du prix avec les modèles de régression
-            reg_model, reg_mse, X_test, y_test, reg_pred = train_regression_model(forex_data[symbol], 'Close')
-            rf_model, rf_mse, X_test, y_test, rf_pred = train_random_forest_model(forex_data[symbol], 'Close')
-            reg_pred_price = reg_pred[-1] if reg_pred is not None else "N/A"
-            rf_pred_price = rf_pred[-1] if rf_pred is not None else "N/A"
-            
-            # Calcul du stop loss et du take profit
-            position_size, stop_loss_price, take_profit_price = calculate_risk_management(forex_data[symbol], action)
-            
-            comments = "Consistent" if action == "buy" and reg_pred_price > tp and rf_pred_price > tp else "Contradictory"
-            reliability = evaluate_reliability(reg_pred_price, rf_pred_price, action, tp)
-            
-            excel_lines.append(["Forex Gainer", symbol, f"{change:.2f}", action, f"{tp:.2f}", f"{max_profit:.2f}", f"{duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{stop_loss_price:.2f}", f"{take_profit_price:.2f}", comments, reliability])
-
-        excel_lines += [["Top Losers Forex Pairs (Last Day)"]]
-        for item in top_losers_forex:
-            symbol, change = item
-            action = analyze_movement(float(change))
-            max_profit = estimate_max_profit(symbol, forex_data)
-            tp = calculate_tp(symbol, forex_data, action)
-            duration = estimate_duration(symbol, forex_data, action)
-            
-            # Prédiction du prix avec les modèles de régression
-            reg_model, reg_mse, X_test, y_test, reg_pred = train_regression_model(forex_data[symbol], 'Close')
-            rf_model, rf_mse, X_test, y_test, rf_pred = train_random_forest_model(forex_data[symbol], 'Close')
-            reg_pred_price = reg_pred[-1] if reg_pred is not None else "N/A"
-            rf_pred_price = rf_pred[-1] if rf_pred is not None else "N/A"
-            
-            # Calcul du stop loss et du take profit
-            position_size, stop_loss_price, take_profit_price = calculate_risk_management(forex_data[symbol], action)
-            
-            comments = "Consistent" if action == "short" and reg_pred_price < tp and rf_pred_price < tp else "Contradictory"
-            reliability = evaluate_reliability(reg_pred_price, rf_pred_price, action, tp)
-            
-            excel_lines.append(["Forex Loser", symbol, f"{change:.2f}", action, f"{tp:.2f}", f"{max_profit:.2f}", f"{duration:.2f}", f"{reg_pred_price}", f"{rf_pred_price}", f"{stop_loss_price:.2f}", f"{take_profit_price:.2f}", comments, reliability])
-
-        # Écrire les résultats dans le fichier Excel
-        write_to_excel(excel_file, excel_lines)
+        fetch_requests, data_by_class, analysis, training_frames, validations, scored = analyze_asset_classes(
+            profile=profile, registry=model_registry, feature_store=feature_store)
+        etf_interval = fetch_requests['ETF'][2]
+        etf_symbols = fetch_requests['ETF'][0]
+
+        etf_data = data_by_class['ETF']
+
+        with profile.stage('results_store'), results_store.stage():
+            results_store.record_movers(run_id, scored)
+            record_predictions(results_store, run_id, training_frames, validations)
+
+        # Écrire les résultats dans le fichier Excel au fur et à mesure, section par section
+        with profile.stage('excel_report'):
+            write_report(scored, excel_file)
         print("Excel file written successfully")
 
-        # Visualisation des données
-        for item in top_gainers_etf + top_losers_etf:
-            symbol, _ = item
-            logging.info(f"Plotting price and indicators for ETF: {symbol}")
-            print(f"Plotting price and indicators for ETF: {symbol}")
-            if symbol in etf_data and 'Close' in etf_data[symbol].columns:
-                etf_indicators = add_technical_indicators(etf_data[symbol])
-                plot_price_and_indicators(symbol, etf_data[symbol], etf_indicators, output_dir)
-            else:
-                logging.error(f"Column 'Close' not found in ETF data for symbol: {symbol}")
-                print(f"Column 'Close' not found in ETF data for symbol: {symbol}")
-
-        for item in top_gainers_cfd + top_losers_cfd:
-            symbol, _ = item
-            logging.info(f"Plotting price and indicators for CFD: {symbol}")
-            print(f"Plotting price and indicators for CFD: {symbol}")
-            if symbol in cfd_data and 'Close' in cfd_data[symbol].columns:
-                cfd_indicators = add_technical_indicators(cfd_data[symbol])
-                plot_price_and_indicators(symbol, cfd_data[symbol], cfd_indicators, output_dir)
-            else:
-                logging.error(f"Column 'Close' not found in CFD data for symbol: {symbol}")
-                print(f"Column 'Close' not found in CFD data for symbol: {symbol}")
-
-        for item in top_gainers_forex + top_losers_forex:
-            symbol, _ = item
-            logging.info(f"Plotting price and indicators for Forex: {symbol}")
-            print(f"Plotting price and indicators for Forex: {symbol}")
-            if symbol in forex_data and 'Close' in forex_data[symbol].columns:
-                forex_indicators = add_technical_indicators(forex_data[symbol])
-                plot_price_and_indicators(symbol, forex_data[symbol], forex_indicators, output_dir)
-            else:
-                logging.error(f"Column 'Close' not found in Forex data for symbol: {symbol}")
-                print(f"Column 'Close' not found in Forex data for symbol: {symbol}")
-
-        # Backtesting des stratégies de trading
-        for symbol in etf_symbols:
-            logging.debug(f"Data for {symbol}: {etf_data[symbol].head()}")
-            print(f"Data for {symbol}: {etf_data[symbol].head()}")
-            strategy = simple_moving_average_strategy(etf_data[symbol])
-            if strategy.empty:
-                logging.error(f"Strategy for {symbol} could not be computed.")
-                print(f"Strategy for {symbol} could not be computed.")
-                continue
-            final_value, trading_log = backtest_strategy(etf_data[symbol], symbol, strategy)
-            logging.info(f"Backtesting {symbol}: Final portfolio value: {final_value}")
-            print(f"Backtesting {symbol}: Final portfolio value: {final_value}")
-            write_backtest_log(symbol, trading_log, backtest_log_file)
-            plot_backtest_results(symbol, etf_data[symbol], trading_log, output_dir)
-
-            # Test with simple strategy
-            simple_strat = simple_strategy(etf_data[symbol])
-            if simple_strat.empty:
-                logging.error(f"Simple strategy for {symbol} could not be computed.")
-                print(f"Simple strategy for {symbol} could not be computed.")
-                continue
-            final_value, trading_log = backtest_strategy(etf_data[symbol], symbol, simple_strat)
-            logging.info(f"Backtesting with simple strategy {symbol}: Final portfolio value: {final_value}")
-            print(f"Backtesting with simple strategy {symbol}: Final portfolio value: {final_value}")
-            write_backtest_log(f"{symbol}_simple_strategy", trading_log, backtest_log_file)
-            plot_backtest_results(f"{symbol}_simple_strategy", etf_data[symbol], trading_log, output_dir)
-
-            # Test with RSI strategy
-            rsi_strat = rsi_strategy(etf_data[symbol])
-            if rsi_strat.empty:
-                logging.error(f"RSI strategy for {symbol} could not be computed.")
-                print(f"RSI strategy for {symbol} could not be computed.")
-                continue
-            final_value, trading_log = backtest_strategy(etf_data[symbol], symbol, rsi_strat)
-            logging.info(f"Backtesting with RSI strategy {symbol}: Final portfolio value: {final_value}")
-            print(f"Backtesting with RSI strategy {symbol}: Final portfolio value: {final_value}")
-            write_backtest_log(f"{symbol}_rsi_strategy", trading_log, backtest_log_file)
-            plot_backtest_results(f"{symbol}_rsi_strategy", etf_data[symbol], trading_log, output_dir)
-
-            # Train regression model and plot results
-            clean_data = etf_data[symbol].dropna()
-            if not clean_data.empty:
-                model, mse, X_test, y_test, y_pred = train_regression_model(clean_data, 'Close')
-                if model:
-                    logging.info(f"Trained regression model for {symbol} with MSE: {mse}")
-                    print(f"Trained regression model for {symbol} with MSE: {mse}")
-                    plot_regression_results(X_test, y_test, y_pred, output_dir)
-
-            # Train clustering model and plot results
-            clustering_data = etf_data[symbol][['Close', 'Volume']].dropna()
-            if not clustering_data.empty:
-                clusters_model, silhouette_avg, clusters = train_clustering_model(clustering_data, n_clusters=3)
-                if clusters_model:
+        # Rendu des graphiques en parallèle ; ceux dont les données n'ont pas changé ne sont pas regénérés
+        with ChartRenderer(output_dir, profile=profile) as renderer:
+            # Visualisation des données
+            for row in analysis.drop_duplicates(['asset_class', 'symbol']).itertuples():
+                symbol, class_data = row.symbol, data_by_class[row.asset_class]
+                logging.info(f"Plotting price and indicators for {row.asset_class}: {symbol}")
+                print(f"Plotting price and indicators for {row.asset_class}: {symbol}")
+                if symbol in class_data and 'Close' in class_data[symbol].columns:
+                    with profile.stage('indicators', symbol=symbol):
+                        indicators = add_technical_indicators(class_data[symbol], symbol=symbol, interval=fetch_requests[row.asset_class][2])
+                    renderer.submit('price_and_indicators', symbol, class_data[symbol][['Close']], indicators)
+                else:
+                    logging.error(f"Column 'Close' not found in {row.asset_class} data for symbol: {symbol}")
+                    print(f"Column 'Close' not found in {row.asset_class} data for symbol: {symbol}")
+
+            # Backtesting des stratégies de trading ; les résultats sont enregistrés en une transaction à la fin
+            backtest_results = []
+            for symbol in etf_symbols:
+                logging.debug(f"Data for {symbol}: {etf_data[symbol].head()}")
+                with profile.stage('backtest', symbol=symbol, strategy='sma'):
+                    strategy = simple_moving_average_strategy(etf_data[symbol])
+                    if not strategy.empty:
+                        final_value, trading_log, equity = backtest_strategy(etf_data[symbol], symbol, strategy, return_equity=True)
+                if strategy.empty:
+                    logging.error(f"Strategy for {symbol} could not be computed.")
+                    print(f"Strategy for {symbol} could not be computed.")
+                    continue
+                backtest_results.append((symbol, 'sma', trading_log, equity))
+                logging.info(f"Backtesting {symbol}: Final portfolio value: {final_value}")
+                print(f"Backtesting {symbol}: Final portfolio value: {final_value}")
+                write_backtest_log(symbol, trading_log, backtest_log_file)
+                renderer.submit('backtest_results', symbol, etf_data[symbol][['Close']], trading_log)
+
+                # Test with simple strategy
+                with profile.stage('backtest', symbol=symbol, strategy='simple'):
+                    simple_strat = simple_strategy(etf_data[symbol])
+                    if not simple_strat.empty:
+                        final_value, trading_log, equity = backtest_strategy(etf_data[symbol], symbol, simple_strat, return_equity=True)
+                if simple_strat.empty:
+                    logging.error(f"Simple strategy for {symbol} could not be computed.")
+                    print(f"Simple strategy for {symbol} could not be computed.")
+                    continue
+                backtest_results.append((symbol, 'simple', trading_log, equity))
+                logging.info(f"Backtesting with simple strategy {symbol}: Final portfolio value: {final_value}")
+                print(f"Backtesting with simple strategy {symbol}: Final portfolio value: {final_value}")
+                write_backtest_log(f"{symbol}_simple_strategy", trading_log, backtest_log_file)
+                renderer.submit('backtest_results', f"{symbol}_simple_strategy", etf_data[symbol][['Close']], trading_log)
+
+                # Test with RSI strategy
+                with profile.stage('backtest', symbol=symbol, strategy='rsi'):
+                    rsi_strat = rsi_strategy(etf_data[symbol])
+                    if not rsi_strat.empty:
+                        final_value, trading_log, equity = backtest_strategy(etf_data[symbol], symbol, rsi_strat, return_equity=True)
+                if rsi_strat.empty:
+                    logging.error(f"RSI strategy for {symbol} could not be computed.")
+                    print(f"RSI strategy for {symbol} could not be computed.")
+                    continue
+                backtest_results.append((symbol, 'rsi', trading_log, equity))
+                logging.info(f"Backtesting with RSI strategy {symbol}: Final portfolio value: {final_value}")
+                print(f"Backtesting with RSI strategy {symbol}: Final portfolio value: {final_value}")
+                write_backtest_log(f"{symbol}_rsi_strategy", trading_log, backtest_log_file)
+                renderer.submit('backtest_results', f"{symbol}_rsi_strategy", etf_data[symbol][['Close']], trading_log)
+
+                # Régression validée walk-forward sur les variables du magasin (partagées avec l'analyse et le clustering)
+                with profile.stage('regression', symbol=symbol):
+                    regression = walk_forward_validate(feature_store.training_data(symbol, etf_interval, etf_data[symbol]),
+                                                       'Close', 'regression', symbol=symbol, registry=model_registry)
+                if regression is not None:
+                    logging.info(f"Trained regression model for {symbol} with walk-forward MSE: {regression['mse']}")
+                    print(f"Trained regression model for {symbol} with walk-forward MSE: {regression['mse']}")
+                    renderer.submit('regression_results', symbol, pd.DataFrame(index=regression['index']),
+                                    regression['actual'], regression['predictions'])
+
+                # Train clustering model and plot results
+                with profile.stage('clustering', symbol=symbol):
+                    clustering_data = feature_store.get(symbol, etf_interval, etf_data[symbol]).select(['Close', 'Volume'])
+                    if not clustering_data.empty:
+                        clusters_model, silhouette_avg, clusters = train_clustering_model(clustering_data, n_clusters=3)
+                if not clustering_data.empty and clusters_model:
                     logging.info(f"Trained clustering model for {symbol} with silhouette score: {silhouette_avg}")
                     print(f"Trained clustering model for {symbol} with silhouette score: {silhouette_avg}")
-                    plot_clustering_results(clustering_data, clusters, output_dir)
+                    renderer.submit('clustering_results', symbol, clustering_data, clusters)
+
+            with profile.stage('results_store'), results_store.stage():
+                for symbol, strategy_name, trading_log, equity in backtest_results:
+                    results_store.record_trades(run_id, symbol, strategy_name, trading_log)
+                    results_store.record_equity(run_id, symbol, strategy_name, equity)
+
+            # Attente de la fin des rendus encore en cours dans le pool
+            with profile.stage('chart_rendering'):
+                renderer.close()
+            profile.count('charts_rendered', renderer.rendered)
+            profile.count('charts_skipped', renderer.skipped)
+
+        # Backtest de l'ensemble des ETF avec une trésorerie commune
+        with profile.stage('portfolio_backtest'):
+            portfolio_prices, portfolio_signals = portfolio_matrices(etf_data, etf_symbols, simple_moving_average_strategy)
+            portfolio_equity, _, portfolio_trades = backtest_portfolio(portfolio_prices.to_numpy(), portfolio_signals.to_numpy())
+        if len(portfolio_equity):
+            logging.info(f"Portfolio backtest for ETFs: Final portfolio value: {portfolio_equity[-1]} ({len(portfolio_trades)} trades)")
+            print(f"Portfolio backtest for ETFs: Final portfolio value: {portfolio_equity[-1]} ({len(portfolio_trades)} trades)")
+            results_store.record_equity(run_id, 'ETF', 'portfolio', pd.Series(portfolio_equity, index=portfolio_prices.index))
+
+        results_store.finish_run(run_id)
 
         logging.info('Script completed successfully')
         print('Script completed successfully')
     except Exception as e:
         logging.error(f'Error in main script: {e}', exc_info=True)
         print(f'Error in main script: {e}')
+        results_store.finish_run(run_id, status='failed')
+    finally:
+        results_store.close()
+        profile.log_summary()
+        profile.write(profile_file)
+
+def command_run(args):
+    main(args.profile, args.sample_interval)
+
+def command_fetch(args):
+    fetch_requests, data_by_class, _ = fetch_asset_classes(args.classes, verbose=False)
+    for asset_class, class_data in data_by_class.items():
+        symbols, period, interval = fetch_requests[asset_class]
+        print(f"{asset_class}: {len(symbols)} symbols, {len(class_data.index)} bars ({period}, {interval})")
+
+def command_movers(args):
+    fetch_asset_classes(args.classes, k=args.k, metric=args.metric)
+
+def command_analyze(args):
+    _, data_by_class, movers_by_class = fetch_asset_classes(args.classes, k=args.k, metric=args.metric, verbose=False)
+    analysis = build_analysis_table(data_by_class, movers_by_class)
+    print(analysis[['section', 'symbol', 'change', 'action', 'tp', 'max_profit', 'duration']].to_string(index=False))
+
+def command_backtest(args):
+    from backtesting import backtest_strategy, simple_moving_average_strategy, simple_strategy, rsi_strategy
+    strategies = {'sma': simple_moving_average_strategy, 'simple': simple_strategy, 'rsi': rsi_strategy}
+    fetch_requests, data_by_class, _ = fetch_asset_classes(args.classes, verbose=False)
+    with ResultsStore() as results_store:
+        run_id = results_store.start_run({'command': 'backtest', 'classes': list(data_by_class), 'strategies': args.strategies})
+        with results_store.stage():
+            for asset_class, class_data in data_by_class.items():
+                for symbol in fetch_requests[asset_class][0]:
+                    for strategy_name in args.strategies:
+                        signals = strategies[strategy_name](class_data[symbol])
+                        if signals.empty:
+                            continue
+                        final_value, trading_log, equity = backtest_strategy(class_data[symbol], symbol, signals, return_equity=True)
+                        results_store.record_trades(run_id, symbol, strategy_name, trading_log)
+                        results_store.record_equity(run_id, symbol, strategy_name, equity)
+                        print(f"{asset_class} {symbol} {strategy_name}: Final portfolio value: {final_value:.2f} ({len(trading_log)} trades)")
+        results_store.finish_run(run_id)
+
+def command_train(args):
+    from model_registry import ModelRegistry
+    from feature_store import FeatureStore
+    _, _, _, _, validations, _ = analyze_asset_classes(args.classes, registry=ModelRegistry(), verbose=False, feature_store=FeatureStore())
+    for symbol in validations:
+        print(f"{symbol}: walk-forward regression MSE {validation_mse(validations, symbol, 'regression')}, "
+              f"random forest MSE {validation_mse(validations, symbol, 'random_forest')}")
+
+def command_report(args):
+    from model_registry import ModelRegistry
+    from feature_store import FeatureStore
+    _, data_by_class, _, training_frames, validations, scored = analyze_asset_classes(args.classes, registry=ModelRegistry(), verbose=False,
+                                                                                      feature_store=FeatureStore())
+    with ResultsStore() as results_store:
+        run_id = results_store.start_run({'command': 'report', 'classes': list(data_by_class)})
+        with results_store.stage():
+            results_store.record_movers(run_id, scored)
+            record_predictions(results_store, run_id, training_frames, validations)
+        results_store.finish_run(run_id)
+    write_report(scored, args.output)
+    print(f"Report written to {args.output}")
+
+def command_plot(args):
+    from technical_indicators import add_technical_indicators
+    from chart_renderer import ChartRenderer
+    ensure_output_dir()
+    fetch_requests, data_by_class, movers_by_class = fetch_asset_classes(args.classes, verbose=False)
+    analysis = build_analysis_table(data_by_class, movers_by_class)
+    with ChartRenderer(output_dir, max_workers=args.workers) as renderer:
+        for row in analysis.drop_duplicates(['asset_class', 'symbol']).itertuples():
+            class_data = data_by_class[row.asset_class]
+            indicators = add_technical_indicators(class_data[row.symbol], symbol=row.symbol, interval=fetch_requests[row.asset_class][2])
+            renderer.submit('price_and_indicators', row.symbol, class_data[row.symbol][['Close']], indicators)
+    print(f"Charts rendered: {renderer.rendered}, unchanged and skipped: {renderer.skipped}")
+
+def command_scan(args):
+    from scanner import Scanner
+    requests = {name: request for name, request in get_asset_class_requests().items() if not args.classes or name in args.classes}
+    Scanner(requests=requests, on_update=lambda asset_class, scored: print(scored[['section', 'symbol', 'change', 'action', 'reliability']].to_string(index=False))).run()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Trade AI: market data, top movers, models, backtests and reports')
+    parser.add_argument('--log-file', default=log_file)
+    # Sans sous-commande : pipeline complet
+    parser.set_defaults(handler=command_run, profile=DEFAULT_PROFILE_FILE, sample_interval=None, classes=None)
+    commands = parser.add_subparsers(dest='command')
+
+    def add_command(name, handler, help_text):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--classes', nargs='+', choices=['ETF', 'CFD', 'Forex'], default=None)
+        command.set_defaults(handler=handler)
+        return command
+
+    run = add_command('run', command_run, 'full pipeline (default)')
+    run.add_argument('--profile', default=DEFAULT_PROFILE_FILE)
+    run.add_argument('--sample-interval', type=float, default=None)
+    add_command('fetch', command_fetch, 'refresh the local bar cache')
+    movers = add_command('movers', command_movers, 'top gainers and losers')
+    movers.add_argument('-k', type=int, default=5)
+    movers.add_argument('--metric', choices=list(MOVER_METRICS), default='change')
+    analyze = add_command('analyze', command_analyze, 'actions, take profit and duration of the top movers')
+    analyze.add_argument('-k', type=int, default=5)
+    analyze.add_argument('--metric', choices=list(MOVER_METRICS), default='change')
+    backtest = add_command('backtest', command_backtest, 'backtest the strategies')
+    backtest.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=STRATEGIES)
+    add_command('train', command_train, 'walk-forward validate the price models of the top movers')
+    report = add_command('report', command_report, 'write the Excel report')
+    report.add_argument('--output', default=excel_file)
+    plot = add_command('plot', command_plot, 'price and indicator charts of the top movers')
+    plot.add_argument('--workers', type=int, default=None)
+    add_command('scan', command_scan, 'continuous scanner')
+    return parser
+
+def cli(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    setup_logging(args.log_file)
+    args.handler(args)
 
 if __name__ == "__main__":
-    main()
-
-print("Script completed successfully")
+    cli()
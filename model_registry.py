@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import joblib
+import pandas as pd
+
+# Répertoire par défaut des modèles entraînés
+DEFAULT_MODEL_DIR = 'models'
+
+
+def row_hashes(data):
+    if hasattr(data, 'to_frame') and not isinstance(data, (pd.DataFrame, pd.Series)):
+        data = data.to_frame()
+    return pd.util.hash_pandas_object(data, index=True).to_numpy()
+
+
+def fingerprint(hashes):
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def feature_set_key(data, target_column):
+    # DataFrame ou FeatureMatrix : les deux exposent .columns
+    features = [str(column) for column in data.columns if column != target_column]
+    return hashlib.sha1('|'.join([str(target_column)] + features).encode()).hexdigest()[:12]
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_MODEL_DIR):
+        self.root = root
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Le registre est transmis aux processus d'entraînement sans son cache mémoire ni son verrou
+        return {'root': self.root}
+
+    def __setstate__(self, state):
+        self.__init__(state['root'])
+
+    def path(self, symbol, model_name, feature_key):
+        safe_symbol = re.sub(r'[^A-Za-z0-9_.=-]', '_', symbol)
+        return os.path.join(self.root, safe_symbol, f"{model_name}-{feature_key}.joblib")
+
+    def _load(self, path):
+        with self._lock:
+            if path in self._entries:
+                return self._entries[path]
+        if not os.path.exists(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            logging.error(f'Error loading cached model {path}: {e}')
+            return None
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def lookup(self, symbol, model_name, data, target_column):
+        # 'hit' : mêmes données ; 'append' : les données stockées + de nouvelles barres ; 'miss' sinon
+        path = self.path(symbol, model_name, feature_set_key(data, target_column))
+        entry = self._load(path)
+        if entry is None or not len(data.index):
+            return 'miss', None
+        hashes = row_hashes(data)
+        if entry['fingerprint'] == fingerprint(hashes):
+            return 'hit', entry
+        # Fenêtre glissante ou ajout : les barres stockées à partir du début des nouvelles données
+        # doivent être identiques, suivies d'au moins une nouvelle barre
+        stored_index = entry['index']
+        try:
+            start = stored_index.searchsorted(data.index[0])
+        except TypeError:
+            return 'miss', entry
+        overlap = entry['row_hashes'][start:]
+        if 0 < len(overlap) < len(hashes) and (hashes[:len(overlap)] == overlap).all():
+            return 'append', entry
+        return 'miss', entry
+
+    def store(self, symbol, model_name, data, target_column, model, result):
+        path = self.path(symbol, model_name, feature_set_key(data, target_column))
+        hashes = row_hashes(data)
+        entry = {
+            'fingerprint': fingerprint(hashes),
+            'row_hashes': hashes,
+            'index': data.index,
+            'model': model,
+            'result': result,
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            joblib.dump(entry, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f'Error saving model {path}: {e}')
+        with self._lock:
+            self._entries[path] = entry
@@ -1,23 +1,76 @@
 import logging
-import pandas as pd
+import numpy as np
+from panel import OHLCVPanel
 
-def get_top_movers(data):
+def _field_matrix(data, field, symbols):
+    if isinstance(data, OHLCVPanel):
+        # Bloc (temps x symbole) du panel : aucune reconstruction de Series par symbole
+        return data.field(field)[:, data.positions(symbols)].astype(float)
+    return data.xs(field, axis=1, level=1)[symbols].to_numpy(dtype=float)
+
+def _percent_change(data, symbols):
+    opening = _field_matrix(data, 'Open', symbols)[0]
+    latest = _field_matrix(data, 'Close', symbols)[-1]
+    return (latest - opening) / opening * 100
+
+def _volume_weighted_change(data, symbols):
+    # Variation moyenne par barre (Close/Open) pondérée par le volume échangé
+    opening = _field_matrix(data, 'Open', symbols)
+    closing = _field_matrix(data, 'Close', symbols)
+    volume = np.nan_to_num(_field_matrix(data, 'Volume', symbols))
+    bar_change = np.nan_to_num((closing - opening) / opening)
+    total_volume = volume.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total_volume > 0, (bar_change * volume).sum(axis=0) / total_volume * 100, np.nan)
+
+def _range(data, symbols):
+    opening = _field_matrix(data, 'Open', symbols)[0]
+    high = np.nanmax(_field_matrix(data, 'High', symbols), axis=0)
+    low = np.nanmin(_field_matrix(data, 'Low', symbols), axis=0)
+    return (high - low) / opening * 100
+
+MOVER_METRICS = {
+    'change': (_percent_change, ['Open', 'Close']),
+    'volume_weighted': (_volume_weighted_change, ['Open', 'Close', 'Volume']),
+    'range': (_range, ['Open', 'High', 'Low']),
+}
+
+def _select(values, indices, k, largest):
+    k = min(k, len(indices))
+    if k == 0:
+        return np.array([], dtype=int)
+    subset = values[indices]
+    if largest:
+        picked = indices[np.argpartition(subset, len(subset) - k)[len(subset) - k:]] if k < len(subset) else indices
+    else:
+        picked = indices[np.argpartition(subset, k - 1)[:k]] if k < len(subset) else indices
+    return picked[np.argsort(values[picked], kind='stable')]
+
+def _rank(compute, data, symbols, k):
+    if not symbols:
+        return [], []
+    values = compute(data, symbols)
+    valid = np.flatnonzero(~np.isnan(values))
+    gainers = _select(values, valid, k, largest=True)
+    losers = _select(values, valid, k, largest=False)
+    top_gainers = [(symbols[i], values[i]) for i in gainers]
+    top_losers = [(symbols[i], values[i]) for i in losers]
+    logging.info('Top movers calculated successfully')
+    return top_gainers, top_losers
+
+def get_top_movers(data, k=5, metric='change'):
     logging.info('Calculating top movers')
     try:
-        movers = {}
-        for symbol in data.columns.levels[0]:
-            if 'Close' in data[symbol] and 'Open' in data[symbol]:
-                latest_price = data[symbol]['Close'].iloc[-1]
-                opening_price = data[symbol]['Open'].iloc[0]
-                if pd.isna(latest_price) or pd.isna(opening_price):
-                    continue
-                percent_change = ((latest_price - opening_price) / opening_price) * 100
-                movers[symbol] = percent_change
-        sorted_movers = sorted(movers.items(), key=lambda x: x[1])
-        top_gainers = sorted_movers[-5:]
-        top_losers = sorted_movers[:5]
-        logging.info('Top movers calculated successfully')
-        return top_gainers, top_losers
+        compute, fields = MOVER_METRICS[metric]
+        if isinstance(data, OHLCVPanel):
+            symbols = data.symbols if all(field in data.fields for field in fields) else []
+            return _rank(compute, data, symbols, k)
+        available = data.columns.remove_unused_levels()
+        symbols = [
+            symbol for symbol in available.levels[0]
+            if all((symbol, field) in available for field in fields)
+        ]
+        return _rank(compute, data, symbols, k)
     except Exception as e:
         logging.error(f'Error calculating top movers: {e}')
         return [], []
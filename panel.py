@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Ordre des champs de get_data ; les champs absents des données sont ignorés
+OHLCV_FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class OHLCVPanel:
+    # Tableau contigu (champ x temps x symbole) en float32, index de dates commun à tous les symboles.
+    # Un champ (values[f]) est un bloc contigu temps x symbole : les calculs transverses entre symboles
+    # sont du calcul matriciel direct. Un symbole est une vue (champ x temps) sans copie.
+    def __init__(self, values, fields, index, symbols):
+        self.values = values
+        self.fields = list(fields)
+        self.index = index
+        self.symbols = list(symbols)
+        self._field_positions = {field: i for i, field in enumerate(self.fields)}
+        self._symbol_positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    @property
+    def empty(self):
+        return self.values.size == 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, symbol):
+        return symbol in self._symbol_positions
+
+    def __getitem__(self, symbol):
+        # Même accès que data[symbol] sur la disposition MultiIndex
+        return self.symbol_frame(symbol)
+
+    def field(self, name):
+        # Vue contiguë (temps x symbole)
+        return self.values[self._field_positions[name]]
+
+    def symbol(self, name):
+        # Vue (champ x temps) à pas constant
+        return self.values[:, :, self._symbol_positions[name]]
+
+    def series(self, symbol, field):
+        return self.values[self._field_positions[field], :, self._symbol_positions[symbol]]
+
+    def positions(self, symbols):
+        return [self._symbol_positions[symbol] for symbol in symbols]
+
+    def symbol_frame(self, symbol):
+        # La transposée de la vue du symbole est le bloc du DataFrame : pas de copie
+        return pd.DataFrame(self.symbol(symbol).T, index=self.index, columns=self.fields, copy=False)
+
+    def field_frame(self, field):
+        return pd.DataFrame(self.field(field), index=self.index, columns=self.symbols, copy=False)
+
+    def select(self, symbols=None, fields=None):
+        # Sous-panel ; copie uniquement si la sélection n'est pas une tranche
+        symbols = self.symbols if symbols is None else list(symbols)
+        fields = self.fields if fields is None else list(fields)
+        values = self.values
+        field_positions = [self._field_positions[field] for field in fields]
+        if field_positions != list(range(len(self.fields))):
+            values = values[field_positions]
+        symbol_positions = self.positions(symbols)
+        if symbol_positions != list(range(len(self.symbols))):
+            values = values[:, :, symbol_positions]
+        return OHLCVPanel(values, fields, self.index, symbols)
+
+    def to_frame(self, dtype=np.float64):
+        # Disposition de get_data : colonnes MultiIndex (symbole, champ)
+        values = self.values.transpose(1, 2, 0).reshape(len(self.index), -1)
+        columns = pd.MultiIndex.from_product([self.symbols, self.fields])
+        return pd.DataFrame(values.astype(dtype), index=self.index, columns=columns, copy=False)
+
+
+def build_panel(data, fields=None, dtype=np.float32):
+    # data : DataFrame à colonnes MultiIndex (symbole, champ), comme get_data ; les couples
+    # (symbole, champ) absents sont remplis de NaN
+    if not isinstance(data.columns, pd.MultiIndex):
+        raise ValueError('build_panel expects columns indexed by (symbol, field)')
+    columns = data.columns.remove_unused_levels()
+    symbols = list(dict.fromkeys(columns.get_level_values(0)))
+    present = list(dict.fromkeys(columns.get_level_values(1)))
+    if fields is None:
+        fields = [field for field in OHLCV_FIELDS if field in present] + [field for field in present if field not in OHLCV_FIELDS]
+
+    values = np.full((len(fields), len(data.index), len(symbols)), np.nan, dtype=dtype)
+    for i, field in enumerate(fields):
+        if field in present:
+            values[i] = data.xs(field, axis=1, level=1).reindex(columns=symbols).to_numpy(dtype=dtype)
+    return OHLCVPanel(values, fields, data.index, symbols)
@@ -0,0 +1,156 @@
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from backtesting import backtest_arrays
+
+DEFAULT_GRIDS = {
+    'sma': {'short_window': [10, 20, 40], 'long_window': [50, 100, 200]},
+    'rsi': {'window': [7, 14, 21], 'overbought': [70, 80], 'oversold': [20, 30]},
+    'simple': {},
+}
+
+# Matrice de prix partagée (symboles x barres) attachée une seule fois par worker
+_shared = {}
+
+
+def _attach_prices(name, shape):
+    block = shared_memory.SharedMemory(name=name)
+    _shared['block'] = block
+    _shared['prices'] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+
+class RollingCache:
+    # Les moyennes glissantes sont calculées une fois par fenêtre et réutilisées par toutes les combinaisons
+    def __init__(self, close):
+        self.close = pd.Series(close)
+        self._means = {}
+        self._rsi = {}
+        self._delta = None
+
+    def mean(self, window, min_periods=None):
+        key = (window, min_periods)
+        if key not in self._means:
+            self._means[key] = self.close.rolling(window=window, min_periods=min_periods).mean().to_numpy()
+        return self._means[key]
+
+    def rsi(self, window):
+        if window not in self._rsi:
+            if self._delta is None:
+                self._delta = self.close.diff()
+            gain = self._delta.where(self._delta > 0, 0).rolling(window=window).mean()
+            loss = (-self._delta.where(self._delta < 0, 0)).rolling(window=window).mean()
+            self._rsi[window] = (100 - (100 / (1 + gain / loss))).to_numpy()
+        return self._rsi[window]
+
+
+def _sma_signal(cache, short_window=40, long_window=100):
+    return np.where(cache.mean(short_window, 1) > cache.mean(long_window, 1), 1.0, 0.0)
+
+
+def _rsi_signal(cache, window=14, overbought=70, oversold=30):
+    rsi = cache.rsi(window)
+    return np.where(rsi > overbought, -1.0, np.where(rsi < oversold, 1.0, 0.0))
+
+
+def _simple_signal(cache):
+    close = cache.close.to_numpy()
+    previous = np.concatenate(([np.nan], close[:-1]))
+    return np.where(close > previous, 1.0, 0.0)
+
+
+SIGNALS = {'sma': _sma_signal, 'rsi': _rsi_signal, 'simple': _simple_signal}
+
+
+def max_drawdown(equity):
+    peaks = np.maximum.accumulate(equity)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drawdowns = np.where(peaks > 0, (peaks - equity) / peaks, 0.0)
+    return float(np.nanmax(drawdowns)) if len(drawdowns) else 0.0
+
+
+def _run_task(symbol_index, length, strategy, combinations, initial_balance):
+    close = _shared['prices'][symbol_index, :length]
+    cache = RollingCache(close)
+    rows = []
+    for params in combinations:
+        signal = SIGNALS[strategy](cache, **params)
+        equity, trade_log = backtest_arrays(close, signal, initial_balance=initial_balance)
+        rows.append({
+            **params,
+            'final_value': float(equity[-1]) if len(equity) else initial_balance,
+            'max_drawdown': max_drawdown(equity),
+            'trade_count': len(trade_log),
+        })
+    return symbol_index, rows
+
+
+def parameter_combinations(strategy, grid=None, n_samples=None, seed=42):
+    grid = DEFAULT_GRIDS[strategy] if grid is None else grid
+    names = list(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    if strategy == 'sma':
+        combinations = [c for c in combinations if c['short_window'] < c['long_window']]
+    if n_samples is not None and n_samples < len(combinations):
+        combinations = random.Random(seed).sample(combinations, n_samples)
+    return combinations
+
+
+def _close_arrays(prices):
+    if isinstance(prices, pd.DataFrame):
+        closes = prices.xs('Close', axis=1, level=1)
+        return {symbol: closes[symbol].dropna().to_numpy(dtype=np.float64) for symbol in closes.columns}
+    return {symbol: np.asarray(values, dtype=np.float64) for symbol, values in prices.items()}
+
+
+def run_sweep(prices, strategy='sma', grid=None, n_samples=None, seed=42, max_workers=None,
+              chunk_size=None, initial_balance=10000.0):
+    logging.info(f'Running {strategy} parameter sweep')
+    closes = _close_arrays(prices)
+    symbols = [symbol for symbol, close in closes.items() if len(close)]
+    combinations = parameter_combinations(strategy, grid, n_samples, seed)
+    if not symbols or not combinations:
+        return pd.DataFrame()
+
+    lengths = [len(closes[symbol]) for symbol in symbols]
+    shape = (len(symbols), max(lengths))
+    block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    matrix = None
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        matrix[:] = np.nan
+        for i, symbol in enumerate(symbols):
+            matrix[i, :lengths[i]] = closes[symbol]
+
+        # Une tâche = un symbole et un lot de combinaisons, pour réutiliser les fenêtres glissantes
+        chunk_size = chunk_size or len(combinations)
+        chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+        tasks = [(i, lengths[i], strategy, chunk, initial_balance) for i in range(len(symbols)) for chunk in chunks]
+
+        max_workers = max_workers or os.cpu_count() or 1
+        if max_workers == 1:
+            _attach_prices(block.name, shape)
+            results = [_run_task(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_prices,
+                                     initargs=(block.name, shape)) as executor:
+                results = list(executor.map(_run_task, *zip(*tasks)))
+    finally:
+        # Libérer toutes les vues sur le bloc avant de le fermer
+        matrix = None
+        if _shared.get('block') is not None and _shared['block'].name == block.name:
+            attached = _shared.pop('block')
+            _shared.clear()
+            attached.close()
+        block.close()
+        block.unlink()
+
+    rows = [{'symbol': symbols[i], 'strategy': strategy, **row} for i, task_rows in results for row in task_rows]
+    table = pd.DataFrame(rows)
+    table = table.sort_values(['final_value', 'max_drawdown'], ascending=[False, True]).reset_index(drop=True)
+    logging.info(f'Parameter sweep finished: {len(table)} backtests')
+    return table
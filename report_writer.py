@@ -0,0 +1,122 @@
+import csv
+import logging
+import os
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+
+# Remplissage des cellules selon leur contenu, appliqué au moment de l'écriture de la ligne
+CELL_FILLS = [
+    ('Gainer', PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")),
+    ('Loser', PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")),
+]
+# Colonne ajoutée aux sorties colonnaires : titre de la dernière ligne de section rencontrée
+SECTION_COLUMN = 'Section'
+REPORT_FORMATS = {'.xlsx': 'excel', '.csv': 'csv', '.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+
+class ReportWriter:
+    # Écrit les lignes au fur et à mesure : classeur openpyxl en mode write-only, CSV en flux,
+    # ou Parquet/Feather par lots de `batch_size` lignes. Sans `format`, il est déduit de l'extension.
+    def __init__(self, path, header=None, sheet_title="Trade Data", batch_size=10000, format=None):
+        self.path = path
+        self.header = list(header) if header is not None else None
+        self.batch_size = batch_size
+        self.rows_written = 0
+        if format is None:
+            extension = os.path.splitext(path)[1].lower()
+            if extension not in REPORT_FORMATS:
+                raise ValueError(f'Unsupported report format: {extension}')
+            format = REPORT_FORMATS[extension]
+        elif format not in REPORT_FORMATS.values():
+            raise ValueError(f'Unsupported report format: {format}')
+        self.format = format
+        self._section = None
+
+        if self.format == 'excel':
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet(sheet_title)
+            if self.header is not None:
+                self._sheet.append(self.header)
+        elif self.format == 'csv':
+            self._file = open(path, 'w', newline='')
+            self._writer = csv.writer(self._file)
+            if self.header is not None:
+                self._writer.writerow(self.header)
+        else:
+            if self.header is None:
+                raise ValueError(f'A header is required for {self.format} reports')
+            self._open_columnar()
+
+    def _open_columnar(self):
+        import pyarrow as pa
+        self._columns = self.header + [SECTION_COLUMN]
+        self._schema = pa.schema([(str(column), pa.string()) for column in self._columns])
+        self._batch = [[] for _ in self._columns]
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        else:
+            # Feather v2 = format de fichier Arrow IPC
+            self._writer = pa.ipc.new_file(self.path, self._schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _styled_row(self, row):
+        # Seules les cellules à colorer deviennent des WriteOnlyCell ; les autres restent des valeurs brutes
+        cells = []
+        for value in row:
+            if isinstance(value, str):
+                fill = next((fill for pattern, fill in CELL_FILLS if pattern in value), None)
+                if fill is not None:
+                    value = WriteOnlyCell(self._sheet, value=value)
+                    value.fill = fill
+            cells.append(value)
+        return cells
+
+    def _flush_batch(self):
+        if not self._batch[0]:
+            return
+        import pyarrow as pa
+        self._writer.write_batch(pa.RecordBatch.from_arrays([pa.array(column, pa.string()) for column in self._batch], schema=self._schema))
+        self._batch = [[] for _ in self._columns]
+
+    def append(self, row):
+        row = list(row)
+        if self.format == 'excel':
+            self._sheet.append(self._styled_row(row))
+        elif self.format == 'csv':
+            self._writer.writerow(row)
+        else:
+            # Une ligne d'une seule cellule est un titre de section : il devient une colonne
+            if len(row) == 1 and len(self.header) > 1:
+                self._section = None if row[0] is None else str(row[0])
+                return
+            row = (row + [None] * len(self.header))[:len(self.header)] + [self._section]
+            for column, value in zip(self._batch, row):
+                column.append(None if value is None else str(value))
+            if len(self._batch[0]) >= self.batch_size:
+                self._flush_batch()
+        self.rows_written += 1
+
+    def append_rows(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def close(self):
+        if self.format == 'excel':
+            if self._workbook is not None:
+                self._workbook.save(self.path)
+                self._workbook = None
+        elif self.format == 'csv':
+            self._file.close()
+        else:
+            if self._writer is not None:
+                self._flush_batch()
+                self._writer.close()
+                self._writer = None
+        logging.info(f'Report successfully written to file: {self.path} ({self.rows_written} rows)')
@@ -0,0 +1,207 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Base SQLite par défaut des résultats ; elle est conservée d'une exécution à l'autre
+DEFAULT_RESULTS_FILE = 'results.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT NOT NULL,
+    parameters TEXT
+);
+CREATE TABLE IF NOT EXISTS movers (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    timestamp TEXT,
+    asset_class TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    change REAL,
+    action TEXT,
+    tp REAL,
+    max_profit REAL,
+    duration REAL,
+    position_size REAL,
+    stop_loss REAL,
+    take_profit REAL,
+    comments TEXT,
+    reliability TEXT
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    symbol TEXT NOT NULL,
+    model TEXT NOT NULL,
+    timestamp TEXT,
+    predicted_price REAL,
+    mse REAL
+);
+CREATE TABLE IF NOT EXISTS backtest_trades (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    symbol TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    side TEXT NOT NULL,
+    price REAL,
+    balance REAL
+);
+CREATE TABLE IF NOT EXISTS equity_curves (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    symbol TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    equity REAL
+);
+CREATE INDEX IF NOT EXISTS idx_movers_symbol ON movers (symbol, run_id);
+CREATE INDEX IF NOT EXISTS idx_movers_timestamp ON movers (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_symbol ON predictions (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON backtest_trades (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_trades_run ON backtest_trades (run_id, symbol, strategy);
+CREATE INDEX IF NOT EXISTS idx_equity_symbol ON equity_curves (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS idx_equity_run ON equity_curves (run_id, symbol, strategy);
+'''
+
+MOVER_COLUMNS = ['asset_class', 'kind', 'symbol', 'change', 'action', 'tp', 'max_profit', 'duration',
+                 'position_size', 'stop_loss', 'take_profit', 'comments', 'reliability']
+
+
+def _timestamp(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _number(value):
+    # "N/A", None et NaN sont stockés comme NULL
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+class ResultsStore:
+    def __init__(self, path=DEFAULT_RESULTS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._in_stage = False
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL : les lectures (requêtes d'historique) ne bloquent pas l'écriture d'une exécution en cours
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        # Bases créées avant l'ajout de l'horodatage des movers (mode scanner)
+        movers_columns = [row[1] for row in self._connection.execute('PRAGMA table_info(movers)')]
+        if movers_columns and 'timestamp' not in movers_columns:
+            self._connection.execute('ALTER TABLE movers ADD COLUMN timestamp TEXT')
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def stage(self):
+        # Toutes les insertions d'une étape dans une seule transaction
+        with self._lock:
+            if self._in_stage:
+                yield self
+                return
+            self._in_stage = True
+            try:
+                with self._connection:
+                    yield self
+            finally:
+                self._in_stage = False
+
+    def _insert(self, sql, rows):
+        with self.stage():
+            self._connection.executemany(sql, rows)
+
+    def start_run(self, parameters=None):
+        with self.stage():
+            cursor = self._connection.execute(
+                'INSERT INTO runs (started_at, status, parameters) VALUES (?, ?, ?)',
+                (datetime.now().isoformat(), 'running', json.dumps(parameters or {}, default=str)))
+        return cursor.lastrowid
+
+    def finish_run(self, run_id, status='completed'):
+        with self.stage():
+            self._connection.execute('UPDATE runs SET finished_at = ?, status = ? WHERE run_id = ?',
+                                     (datetime.now().isoformat(), status, run_id))
+
+    def record_movers(self, run_id, table, timestamp=None):
+        # table : candidats notés par analysis_engine.score_candidates
+        rows = table.reindex(columns=MOVER_COLUMNS)
+        timestamp = _timestamp(timestamp if timestamp is not None else datetime.now())
+        values = (
+            (run_id, timestamp, row.asset_class, row.kind, row.symbol, _number(row.change), row.action, _number(row.tp),
+             _number(row.max_profit), _number(row.duration), _number(row.position_size), _number(row.stop_loss),
+             _number(row.take_profit), row.comments, row.reliability)
+            for row in rows.itertuples(index=False)
+        )
+        self._insert(f'INSERT INTO movers (run_id, timestamp, {", ".join(MOVER_COLUMNS)}) VALUES ({", ".join("?" * (len(MOVER_COLUMNS) + 2))})', values)
+
+    def record_predictions(self, run_id, predictions):
+        # predictions : itérable de (symbol, model, timestamp, predicted_price, mse)
+        self._insert(
+            'INSERT INTO predictions (run_id, symbol, model, timestamp, predicted_price, mse) VALUES (?, ?, ?, ?, ?, ?)',
+            ((run_id, symbol, model, None if timestamp is None else _timestamp(timestamp), _number(price), _number(mse))
+             for symbol, model, timestamp, price, mse in predictions))
+
+    def record_trades(self, run_id, symbol, strategy, trading_log):
+        # trading_log : liste (date, side, price, balance) de backtesting.backtest_strategy
+        self._insert(
+            'INSERT INTO backtest_trades (run_id, symbol, strategy, timestamp, side, price, balance) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((run_id, symbol, strategy, _timestamp(date), side, _number(price), _number(balance))
+             for date, side, price, balance in trading_log))
+
+    def record_equity(self, run_id, symbol, strategy, equity):
+        # equity : Series indexée par date
+        self._insert(
+            'INSERT INTO equity_curves (run_id, symbol, strategy, timestamp, equity) VALUES (?, ?, ?, ?, ?)',
+            ((run_id, symbol, strategy, _timestamp(date), _number(value)) for date, value in equity.items()))
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._connection, params=params)
+
+    def runs(self):
+        return self.query('SELECT * FROM runs ORDER BY run_id')
+
+    def latest_run(self, status='completed'):
+        runs = self.query('SELECT run_id FROM runs WHERE status = ? ORDER BY run_id DESC LIMIT 1', (status,))
+        return int(runs['run_id'].iloc[0]) if len(runs) else None
+
+    def trades(self, symbol, start=None, end=None, run_id=None):
+        sql = 'SELECT * FROM backtest_trades WHERE symbol = ?'
+        params = [symbol]
+        if start is not None:
+            sql += ' AND timestamp >= ?'
+            params.append(_timestamp(start))
+        if end is not None:
+            sql += ' AND timestamp <= ?'
+            params.append(_timestamp(end))
+        if run_id is not None:
+            sql += ' AND run_id = ?'
+            params.append(run_id)
+        return self.query(sql + ' ORDER BY timestamp', params)
+
+    def compare_runs(self, run_a, run_b):
+        # Valeur finale de chaque (symbole, stratégie) dans deux exécutions, côte à côte
+        final = self.query(
+            'SELECT run_id, symbol, strategy, equity FROM equity_curves e '
+            'WHERE run_id IN (?, ?) AND timestamp = (SELECT MAX(timestamp) FROM equity_curves '
+            'WHERE run_id = e.run_id AND symbol = e.symbol AND strategy = e.strategy)',
+            (run_a, run_b))
+        return final.pivot_table(index=['symbol', 'strategy'], columns='run_id', values='equity')
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
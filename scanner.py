@@ -0,0 +1,155 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from data_fetcher import get_asset_class_requests
+from fetch_scheduler import FetchScheduler
+from movers_calculator import get_top_movers
+from analysis_engine import build_analysis_table, score_candidates
+from feature_store import FeatureStore
+from indicator_engine import bar_key
+from model_registry import ModelRegistry
+from walk_forward import walk_forward_batch
+from results_store import ResultsStore
+
+# Fréquence de rafraîchissement (secondes) de chaque classe d'actifs, alignée sur l'intervalle des barres
+SCAN_CADENCE = {'ETF': 3600, 'CFD': 60, 'Forex': 300}
+
+
+def bar_state(frame):
+    # Dernière barre, nombre de barres et valeurs de la dernière barre : suffit à savoir si un symbole a bougé
+    if frame.empty:
+        return None
+    return bar_key('', None, frame)[2:]
+
+
+class Scanner:
+    # Mode continu : chaque classe d'actifs est rafraîchie à sa propre fréquence. Les barres sont
+    # complétées depuis le cache local (seules les nouvelles sont téléchargées) et seuls les symboles
+    # dont les barres ont changé voient leurs indicateurs et leurs modèles recalculés.
+    def __init__(self, requests=None, cadence=None, scheduler=None, results_store=None,
+                 registry=None, feature_store=None, on_update=None, max_workers=None):
+        self.requests = requests if requests is not None else get_asset_class_requests()
+        self.cadence = {**SCAN_CADENCE, **(cadence or {})}
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or FetchScheduler()
+        self.results_store = results_store or ResultsStore()
+        self.registry = registry or ModelRegistry()
+        self.feature_store = feature_store or FeatureStore()
+        self.on_update = on_update
+        self.max_workers = max_workers
+        self._executor = None
+        self.run_id = None
+        self.cycles = 0
+        self.data = {}
+        self._states = {}
+        self._predictions = {}
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def changed_symbols(self, asset_class, data, symbols):
+        changed = []
+        for symbol in symbols:
+            if symbol not in data:
+                continue
+            state = bar_state(data[symbol])
+            if state is not None and self._states.get((asset_class, symbol)) != state:
+                self._states[(asset_class, symbol)] = state
+                changed.append(symbol)
+        return changed
+
+    def _validation(self, symbol, model_name):
+        return self._predictions.get(symbol, {}).get(model_name)
+
+    def _forecast(self, symbol, model_name):
+        # Prévision walk-forward de la prochaine clôture, comme main.analyze_asset_class
+        result = self._validation(symbol, model_name)
+        return result['forecast'] if result is not None and result['forecast'] is not None else float('nan')
+
+    def _mse(self, symbol, model_name):
+        result = self._validation(symbol, model_name)
+        return result['mse'] if result is not None else None
+
+    def refresh(self, asset_class):
+        started = time.perf_counter()
+        symbols, period, interval = self.requests[asset_class]
+        data = self.scheduler.submit(symbols, period, interval).result()
+        if data.empty:
+            logging.warning(f'No data for {asset_class}, skipping this cycle')
+            return None
+        self.data[asset_class] = data
+        changed = self.changed_symbols(asset_class, data, symbols)
+
+        top_gainers, top_losers = get_top_movers(data)
+        analysis = build_analysis_table({asset_class: data}, {asset_class: (top_gainers, top_losers)})
+
+        # Modèles : validés (walk-forward) uniquement pour les movers dont les barres ont changé. Leurs variables
+        # viennent du magasin, indexé par dernière barre : seuls les symboles modifiés sont recalculés
+        changed = set(changed)
+        to_train = {symbol: self.feature_store.training_data(symbol, interval, data[symbol]) for symbol in analysis['symbol'].unique()
+                    if symbol in changed or symbol not in self._predictions}
+        if to_train:
+            self._predictions.update(walk_forward_batch(to_train, 'Close', registry=self.registry,
+                                                        max_workers=self.max_workers, executor=self._executor))
+
+        scored = score_candidates(
+            analysis,
+            [self._forecast(symbol, 'regression') for symbol in analysis['symbol']],
+            [self._forecast(symbol, 'random_forest') for symbol in analysis['symbol']],
+        )
+        self.publish(asset_class, scored, to_train)
+        logging.info(f'Scanned {asset_class}: {len(changed)} changed symbols, {len(to_train)} retrained '
+                     f'in {time.perf_counter() - started:.2f}s')
+        return scored
+
+    def publish(self, asset_class, scored, trained):
+        with self.results_store.stage():
+            self.results_store.record_movers(self.run_id, scored, timestamp=datetime.now())
+            self.results_store.record_predictions(self.run_id, [
+                (symbol, model_name, data.index[-1], self._forecast(symbol, model_name), self._mse(symbol, model_name))
+                for symbol, data in trained.items() for model_name in self._predictions[symbol]
+            ])
+        if self.on_update is not None:
+            self.on_update(asset_class, scored)
+
+    def run(self, max_cycles=None):
+        self.run_id = self.results_store.start_run({'mode': 'scan', 'cadence': self.cadence})
+        # File de priorité (prochaine échéance, classe d'actifs)
+        due = [(time.monotonic(), asset_class) for asset_class in self.requests]
+        heapq.heapify(due)
+        # Un seul pool d'entraînement pour toute la durée du scanner plutôt qu'un par cycle
+        workers = self.max_workers or os.cpu_count() or 1
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        status = 'completed'
+        try:
+            while due and not self._stop.is_set() and (max_cycles is None or self.cycles < max_cycles):
+                next_time, asset_class = heapq.heappop(due)
+                if self._stop.wait(max(0.0, next_time - time.monotonic())):
+                    break
+                try:
+                    self.refresh(asset_class)
+                except Exception as e:
+                    logging.error(f'Error scanning {asset_class}: {e}', exc_info=True)
+                self.cycles += 1
+                # Une échéance manquée (cycle trop long) n'est pas rattrapée
+                cadence = self.cadence[asset_class]
+                heapq.heappush(due, (max(next_time + cadence, time.monotonic()), asset_class))
+        except KeyboardInterrupt:
+            status = 'stopped'
+        except Exception:
+            status = 'failed'
+            raise
+        finally:
+            self.results_store.finish_run(self.run_id, status=status)
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._owns_scheduler:
+                self.scheduler.shutdown()
+
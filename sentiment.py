@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Cache persistant par défaut des scores (clé : hash SHA-1 du titre)
+DEFAULT_CACHE_FILE = 'sentiment_cache.sqlite'
+# En dessous de ce nombre de titres à scorer, le pool de processus ne vaut pas son coût de démarrage
+MIN_PARALLEL_HEADLINES = 5000
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+_default_cache = None
+
+
+def get_analyzer():
+    # Le lexique VADER n'est chargé qu'une fois par processus
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            _analyzer = SentimentIntensityAnalyzer()
+        return _analyzer
+
+
+def headline_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    def __init__(self, path=DEFAULT_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL)')
+        self._connection.commit()
+
+    def get_many(self, keys, batch_size=500):
+        scores = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._connection.execute(f'SELECT key, score FROM scores WHERE key IN ({placeholders})', batch)
+                scores.update(rows.fetchall())
+        return scores
+
+    def put_many(self, scores):
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)', scores.items())
+
+    def close(self):
+        self._connection.close()
+
+
+def get_default_cache():
+    # Ouvert à la première utilisation : importer le module ne crée pas la base
+    global _default_cache
+    with _analyzer_lock:
+        if _default_cache is None:
+            _default_cache = SentimentCache()
+        return _default_cache
+
+
+def _score_texts(texts):
+    analyzer = get_analyzer()
+    return [analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+def score_headlines(headlines, cache=None, max_workers=None, chunk_size=1000):
+    # cache=None : cache persistant par défaut ; cache=False : aucun cache
+    cache = get_default_cache() if cache is None else (cache or None)
+    headlines = ['' if text is None else str(text) for text in headlines]
+    # Les titres identiques ne sont scorés qu'une fois
+    keys = [headline_key(text) for text in headlines]
+    unique = dict(zip(keys, headlines))
+    scores = cache.get_many(unique) if cache is not None else {}
+    missing = [(key, text) for key, text in unique.items() if key not in scores]
+    logging.info(f'Scoring {len(missing)} new headlines ({len(headlines)} total, {len(unique)} unique)')
+
+    if missing:
+        texts = [text for _, text in missing]
+        workers = max_workers or 1
+        if workers > 1 and len(texts) >= MIN_PARALLEL_HEADLINES:
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1, len(chunks))) as executor:
+                computed = [score for chunk_scores in executor.map(_score_texts, chunks) for score in chunk_scores]
+        else:
+            computed = _score_texts(texts)
+        new_scores = {key: score for (key, _), score in zip(missing, computed)}
+        if cache is not None:
+            cache.put_many(new_scores)
+        scores.update(new_scores)
+
+    return [scores[key] for key in keys]
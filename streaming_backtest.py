@@ -0,0 +1,110 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from parameter_sweep import SIGNALS, RollingCache
+
+# Backtest événementiel sur des barres lues par blocs de taille fixe : seuls le bloc courant
+# et la queue de barres nécessaire aux indicateurs restent en mémoire.
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def parquet_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        frame = batch.to_pandas()
+        yield frame.index.to_numpy(), frame['Close'].to_numpy(dtype=np.float64)
+
+
+def write_memmap(frame, directory):
+    # Les horodatages sont stockés en datetime64[ns] UTC sans fuseau
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'close.npy'), frame['Close'].to_numpy(dtype=np.float64))
+    np.save(os.path.join(directory, 'index.npy'), frame.index.to_numpy(dtype='datetime64[ns]'))
+
+
+def memmap_chunks(directory, chunk_size=DEFAULT_CHUNK_SIZE):
+    close = np.load(os.path.join(directory, 'close.npy'), mmap_mode='r')
+    index = np.load(os.path.join(directory, 'index.npy'), mmap_mode='r')
+    for start in range(0, len(close), chunk_size):
+        yield np.asarray(index[start:start + chunk_size]), np.asarray(close[start:start + chunk_size])
+
+
+def frame_chunks(frame, chunk_size=DEFAULT_CHUNK_SIZE):
+    for start in range(0, len(frame), chunk_size):
+        chunk = frame.iloc[start:start + chunk_size]
+        yield chunk.index.to_numpy(), chunk['Close'].to_numpy(dtype=np.float64)
+
+
+def strategy_lookback(strategy, params):
+    if strategy == 'sma':
+        return max(params.get('short_window', 40), params.get('long_window', 100))
+    if strategy == 'rsi':
+        return params.get('window', 14)
+    return 1
+
+
+class StreamingBacktest:
+    def __init__(self, strategy='sma', initial_balance=10000.0, **params):
+        self.strategy = strategy
+        self.params = params
+        self.lookback = strategy_lookback(strategy, params)
+        self.tail = np.empty(0)
+        self.cash = initial_balance
+        self.previous_signal = None
+        self.equity = initial_balance
+        self.bars = 0
+
+    def process(self, index, close):
+        if not len(close):
+            return []
+        # Les signaux sont calculés sur la queue du bloc précédent + le bloc courant,
+        # ce qui reproduit exactement les fenêtres glissantes du calcul sur tout l'historique
+        window = np.concatenate([self.tail, close])
+        signal = SIGNALS[self.strategy](RollingCache(window), **self.params)[len(self.tail):]
+        self.tail = window[-self.lookback:]
+
+        first_bar = self.previous_signal is None
+        previous = signal[0] if first_bar else self.previous_signal
+        pos_diff = np.diff(signal, prepend=previous)
+        cash = self.cash - np.cumsum(np.nan_to_num(pos_diff * close))
+        equity = cash + np.nan_to_num(signal * close)
+
+        positions = pos_diff.copy()
+        if first_bar and len(positions):
+            positions[0] = np.nan
+        events = np.flatnonzero((positions == 1.0) | (positions == -1.0))
+        trades = [
+            (index[i], 'buy' if positions[i] == 1.0 else 'sell', close[i], equity[i])
+            for i in events
+        ]
+
+        self.cash = cash[-1]
+        self.equity = equity[-1]
+        self.previous_signal = signal[-1]
+        self.bars += len(close)
+        return trades
+
+    def run(self, chunks):
+        for index, close in chunks:
+            yield self.process(index, close)
+
+
+def run_streaming_backtest(chunks, symbol, log_file, strategy='sma', initial_balance=10000.0, **params):
+    logging.info(f'Streaming backtest for {symbol} ({strategy})')
+    backtest = StreamingBacktest(strategy, initial_balance, **params)
+    trade_count = 0
+    try:
+        # Le journal des trades est écrit au fil des blocs, au format de write_backtest_log
+        with open(log_file, 'a') as file:
+            file.write(f'Backtesting results for {symbol}:\n')
+            for trades in backtest.run(chunks):
+                for date, side, price, balance in trades:
+                    file.write(f'{pd.Timestamp(date)}, {side}, Price: {price}, Balance: {balance}\n')
+                trade_count += len(trades)
+        logging.info(f'Streaming backtest for {symbol} done: {backtest.bars} bars, {trade_count} trades')
+    except Exception as e:
+        logging.error(f'Error in streaming backtest for {symbol}: {e}')
+    return backtest.equity, trade_count
@@ -0,0 +1,199 @@
+import math
+from collections import deque
+
+# Versions incrémentales (O(1) par barre) des indicateurs de technical_indicators.
+# Chaque classe consomme une barre à la fois via update() et renvoie la même valeur
+# que la version batch sur la même position de la série.
+
+
+def _is_missing(value):
+    return value is None or value != value
+
+
+class EMA:
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = math.nan
+        self.old_weight = 1.0
+
+    def update(self, value):
+        # Équivalent de series.ewm(span=span, adjust=False).mean(), y compris après des barres manquantes
+        if math.isnan(self.value):
+            if not _is_missing(value):
+                self.value = float(value)
+            return self.value
+        self.old_weight *= 1 - self.alpha
+        if not _is_missing(value):
+            self.value = (self.old_weight * self.value + self.alpha * value) / (self.old_weight + self.alpha)
+            self.old_weight = 1.0
+        return self.value
+
+
+class MACD:
+    def __init__(self, short_period=12, long_period=26, signal_period=9):
+        self.short_ema = EMA(short_period)
+        self.long_ema = EMA(long_period)
+        self.signal_ema = EMA(signal_period)
+        self.macd = math.nan
+        self.signal_line = math.nan
+
+    def update(self, value):
+        self.macd = self.short_ema.update(value) - self.long_ema.update(value)
+        self.signal_line = self.signal_ema.update(self.macd)
+        return self.macd, self.signal_line
+
+
+class RollingWindow:
+    # Somme glissante et variance de Welford sur une fenêtre fixe (ddof=1, comme pandas)
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value):
+        if self.count == 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def update(self, value):
+        missing = _is_missing(value)
+        self.values.append(None if missing else float(value))
+        if not missing:
+            self._add(float(value))
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old is not None:
+                self._remove(old)
+        return self.average()
+
+    def average(self):
+        if self.count == 0 or self.count < self.min_periods:
+            return math.nan
+        return self.mean
+
+    def std(self):
+        if self.count < 2 or self.count < self.min_periods:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+
+class SMA(RollingWindow):
+    pass
+
+
+class BollingerBands:
+    def __init__(self, window=20):
+        self.window = RollingWindow(window)
+
+    def update(self, value):
+        sma = self.window.update(value)
+        std = self.window.std()
+        return sma + (std * 2), sma - (std * 2)
+
+
+class RSI:
+    # smoothing='sma' reproduit calculate_rsi (moyennes glissantes simples) ;
+    # smoothing='wilder' applique le lissage exponentiel de Wilder après la première fenêtre.
+    def __init__(self, period=14, smoothing='sma'):
+        if smoothing not in ('sma', 'wilder'):
+            raise ValueError(f'Unknown RSI smoothing: {smoothing}')
+        self.period = period
+        self.smoothing = smoothing
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+        self.avg_gain = math.nan
+        self.avg_loss = math.nan
+        self.previous = None
+        self.value = math.nan
+
+    def update(self, value):
+        if self.previous is None or _is_missing(value) or _is_missing(self.previous):
+            # Comme delta.where(delta > 0, 0) : une variation manquante compte comme 0
+            delta = 0.0
+        else:
+            delta = float(value) - self.previous
+        self.previous = None if _is_missing(value) else float(value)
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self.smoothing == 'wilder' and not math.isnan(self.avg_gain):
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        else:
+            self.avg_gain = self.gains.update(gain)
+            self.avg_loss = self.losses.update(loss)
+
+        if math.isnan(self.avg_gain):
+            self.value = math.nan
+        elif self.avg_loss == 0:
+            self.value = 100.0 if self.avg_gain > 0 else math.nan
+        else:
+            self.value = 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+        return self.value
+
+
+class StreamingIndicators:
+    # Même déclaration que indicator_engine : {nom de colonne: indicateur}
+    def __init__(self, columns):
+        self.columns = columns
+        self._states = {}
+        for indicator in columns.values():
+            self._state_for(indicator)
+
+    def _state_key(self, indicator):
+        kind = indicator[0]
+        if kind in ('macd', 'macd_signal'):
+            return ('macd',) + tuple(indicator[1:3]) + ((indicator[3],) if kind == 'macd_signal' else (9,))
+        if kind in ('bb_upper', 'bb_lower'):
+            return ('bb', indicator[1])
+        return indicator
+
+    def _state_for(self, indicator):
+        key = self._state_key(indicator)
+        if key not in self._states:
+            kind = key[0]
+            if kind == 'sma':
+                self._states[key] = SMA(key[1], key[2] if len(key) > 2 else None)
+            elif kind == 'ema':
+                self._states[key] = EMA(key[1])
+            elif kind == 'rsi':
+                self._states[key] = RSI(key[1])
+            elif kind == 'macd':
+                self._states[key] = MACD(key[1], key[2], key[3])
+            elif kind == 'bb':
+                self._states[key] = BollingerBands(key[1])
+            else:
+                raise ValueError(f'Unknown indicator: {indicator}')
+        return key
+
+    def update(self, close):
+        outputs = {key: state.update(close) for key, state in self._states.items()}
+        values = {}
+        for column, indicator in self.columns.items():
+            output = outputs[self._state_key(indicator)]
+            kind = indicator[0]
+            if kind in ('macd', 'bb_upper'):
+                output = output[0]
+            elif kind in ('macd_signal', 'bb_lower'):
+                output = output[1]
+            values[column] = output
+        return values
+
+    def warm_up(self, closes):
+        values = {}
+        for close in closes:
+            values = self.update(close)
+        return values
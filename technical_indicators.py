@@ -1,14 +1,35 @@
 import pandas as pd
+from indicator_engine import add_indicators
 
-def add_technical_indicators(data):
-    short_window = 40
-    long_window = 100
-    data['short_mavg'] = data['Close'].rolling(window=short_window, min_periods=1, center=False).mean()
-    data['long_mavg'] = data['Close'].rolling(window=long_window, min_periods=1, center=False).mean()
-    data['rsi'] = calculate_rsi(data['Close'])
-    data['macd'], data['signal_line'] = calculate_macd(data['Close'])
-    data['bollinger_upper'], data['bollinger_lower'] = calculate_bollinger_bands(data['Close'])
-    return data
+PLOT_INDICATORS = {
+    'short_mavg': ('sma', 40, 1),
+    'long_mavg': ('sma', 100, 1),
+    'rsi': ('rsi', 14),
+    'macd': ('macd', 12, 26),
+    'signal_line': ('macd_signal', 12, 26, 9),
+    'bollinger_upper': ('bb_upper', 20),
+    'bollinger_lower': ('bb_lower', 20),
+}
+
+# Indicateurs utilisés par l'analyse et les modèles de machine learning
+ML_INDICATORS = {
+    'SMA': ('sma', 20),
+    'EMA': ('ema', 20),
+    'RSI': ('rsi', 14),
+    'Upper_BB': ('bb_upper', 20),
+    'Lower_BB': ('bb_lower', 20),
+}
+
+MULTITEMP_INDICATORS = {}
+for _window in [5, 10, 20]:  # Short, medium, long term windows
+    MULTITEMP_INDICATORS[f'SMA_{_window}'] = ('sma', _window)
+    MULTITEMP_INDICATORS[f'RSI_{_window}'] = ('rsi', _window)
+
+def add_technical_indicators(data, symbol=None, interval=None):
+    return add_indicators(data, PLOT_INDICATORS, symbol=symbol, interval=interval)
+
+def add_ml_indicators(data, symbol=None, interval=None):
+    return add_indicators(data, {**ML_INDICATORS, **MULTITEMP_INDICATORS}, symbol=symbol, interval=interval)
 
 def calculate_rsi(series, period=14):
     delta = series.diff(1)
@@ -31,12 +52,8 @@ def calculate_bollinger_bands(series, window=20):
     lower_band = sma - (std * 2)
     return upper_band, lower_band
 
-def add_multitemp_indicators(data):
-    windows = [5, 10, 20]  # Short, medium, long term windows
-    for window in windows:
-        data[f'SMA_{window}'] = calculate_moving_average(data, window)
-        data[f'RSI_{window}'] = calculate_rsi(data['Close'], window)
-    return data
+def add_multitemp_indicators(data, symbol=None, interval=None):
+    return add_indicators(data, MULTITEMP_INDICATORS, symbol=symbol, interval=interval)
 
 def calculate_moving_average(data, window):
     return data['Close'].rolling(window=window).mean()
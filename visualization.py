@@ -1,6 +1,12 @@
 import os
+import matplotlib
+# Backend sans interface graphique : les graphiques sont seulement écrits sur disque, y compris depuis les processus de rendu
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 
+def chart_path(output_dir, kind, symbol=None):
+    return os.path.join(output_dir, f"{symbol}_{kind}.png" if symbol else f"{kind}.png")
+
 def plot_price_and_indicators(symbol, data, indicators, output_dir):
     plt.figure(figsize=(10, 6))
     plt.plot(data['Close'], label='Close Price')
@@ -8,7 +14,7 @@ def plot_price_and_indicators(symbol, data, indicators, output_dir):
         plt.plot(values, label=indicator_name)
     plt.title(f"{symbol} Price and Technical Indicators")
     plt.legend()
-    plt.savefig(os.path.join(output_dir, f"{symbol}_price_and_indicators.png"))
+    plt.savefig(chart_path(output_dir, 'price_and_indicators', symbol))
     plt.close()
 
 def plot_backtest_results(symbol, data, trading_log, output_dir):
@@ -22,25 +28,25 @@ def plot_backtest_results(symbol, data, trading_log, output_dir):
     plt.plot(sell_dates, sell_signals, 'v', markersize=10, color='r', lw=0, label='Sell Signal')
     plt.title(f"{symbol} Backtest Results")
     plt.legend()
-    plt.savefig(os.path.join(output_dir, f"{symbol}_backtest_results.png"))
+    plt.savefig(chart_path(output_dir, 'backtest_results', symbol))
     plt.close()
 
-def plot_regression_results(X_test, y_test, y_pred, output_dir):
+def plot_regression_results(X_test, y_test, y_pred, output_dir, symbol=None):
     plt.figure(figsize=(10, 6))
     plt.scatter(X_test.index, y_test, color='blue', label='Actual')
     plt.plot(X_test.index, y_pred, color='red', label='Predicted')
     plt.xlabel('Index')
     plt.ylabel('Price')
-    plt.title('Regression Model Results')
+    plt.title(f"{symbol} Regression Model Results" if symbol else 'Regression Model Results')
     plt.legend()
-    plt.savefig(os.path.join(output_dir, 'regression_results.png'))
+    plt.savefig(chart_path(output_dir, 'regression_results', symbol))
     plt.close()
 
-def plot_clustering_results(data, clusters, output_dir):
+def plot_clustering_results(data, clusters, output_dir, symbol=None):
     plt.figure(figsize=(10, 6))
     plt.scatter(data.iloc[:, 0], data.iloc[:, 1], c=clusters, cmap='viridis', marker='o')
     plt.xlabel('Feature 1')
     plt.ylabel('Feature 2')
-    plt.title('Clustering Results')
-    plt.savefig(os.path.join(output_dir, 'clustering_results.png'))
+    plt.title(f"{symbol} Clustering Results" if symbol else 'Clustering Results')
+    plt.savefig(chart_path(output_dir, 'clustering_results', symbol))
     plt.close()
@@ -0,0 +1,199 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from feature_store import FeatureMatrix
+
+# Validation walk-forward : chaque pli s'entraîne uniquement sur le passé et prédit la
+# barre suivante (cible décalée de `horizon`), sans mélange aléatoire des observations.
+
+
+def walk_forward_splits(n_samples, n_folds=5, window='expanding', train_size=None, test_size=None):
+    if n_folds < 1:
+        raise ValueError(f'Not enough samples ({n_samples}) for walk-forward validation')
+    test_size = test_size or max(1, n_samples // (n_folds + 1))
+    first_test = n_samples - n_folds * test_size
+    if first_test <= 0:
+        raise ValueError(f'Not enough samples ({n_samples}) for {n_folds} folds of {test_size}')
+    splits = []
+    for fold in range(n_folds):
+        test_start = first_test + fold * test_size
+        train_start = 0 if window == 'expanding' else max(0, test_start - (train_size or first_test))
+        splits.append((train_start, test_start, test_start + test_size))
+    return splits
+
+
+def feature_matrix(data, target_column, horizon=1):
+    # Matrice calculée une seule fois ; les plis n'en prennent que des tranches (vues)
+    if isinstance(data, FeatureMatrix):
+        # Variables du magasin (indicateurs et rendements retardés)
+        X = data.features(target_column).astype(np.float64)
+        target = data.column(target_column).astype(np.float64)
+        y = np.full_like(target, np.nan)
+        y[:len(target) - horizon] = target[horizon:]
+    else:
+        X = data.drop(columns=[target_column]).to_numpy(dtype=np.float64)
+        y = data[target_column].shift(-horizon).to_numpy(dtype=np.float64)
+    features_ok = ~np.isnan(X).any(axis=1)
+    labeled = features_ok & ~np.isnan(y)
+    last_row = np.flatnonzero(features_ok)[-1] if features_ok.any() else None
+    return X[labeled], y[labeled], (X[last_row:last_row + 1] if last_row is not None else None), data.index[labeled]
+
+
+class IncrementalOLS:
+    # Régression linéaire par statistiques suffisantes (X'X, X'y) : ajouter ou retirer des
+    # lignes coûte O(lignes), ce qui évite de refaire tout l'ajustement à chaque pli
+    def __init__(self, n_features):
+        self.xtx = np.zeros((n_features + 1, n_features + 1))
+        self.xty = np.zeros(n_features + 1)
+        self.coef = np.zeros(n_features + 1)
+
+    @staticmethod
+    def _design(X):
+        return np.hstack([X, np.ones((len(X), 1))])
+
+    def add(self, X, y):
+        design = self._design(X)
+        self.xtx += design.T @ design
+        self.xty += design.T @ y
+
+    def remove(self, X, y):
+        design = self._design(X)
+        self.xtx -= design.T @ design
+        self.xty -= design.T @ y
+
+    def fit(self):
+        self.coef = np.linalg.pinv(self.xtx) @ self.xty
+        return self
+
+    def predict(self, X):
+        return self._design(X) @ self.coef
+
+
+def _fit_forest_fold(X_train, y_train, X_test, n_estimators):
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42)
+    model.fit(X_train, y_train)
+    return model.predict(X_test)
+
+
+def _regression_folds(X, y, splits):
+    model = IncrementalOLS(X.shape[1])
+    train_start, train_end = 0, 0
+    predictions = []
+    for start, test_start, test_end in splits:
+        # Ajouter les nouvelles lignes d'entraînement et retirer celles sorties de la fenêtre
+        model.add(X[train_end:test_start], y[train_end:test_start])
+        if start > train_start:
+            model.remove(X[train_start:start], y[train_start:start])
+        train_start, train_end = start, test_start
+        predictions.append(model.fit().predict(X[test_start:test_end]))
+    # Modèle final sur la dernière fenêtre prolongée jusqu'à la dernière barre étiquetée
+    model.add(X[train_end:], y[train_end:])
+    return predictions, model.fit()
+
+
+def _forest_folds(X, y, splits, window, n_estimators, max_workers):
+    # Une forêt neuve par pli : compléter une forêt d'un pli à l'autre laisse la plupart des
+    # arbres entraînés sur un passé ancien, et la prévision finale sans les barres récentes
+    workers = max_workers or os.cpu_count() or 1
+    args = [(X[start:test_start], y[start:test_start], X[test_start:test_end], n_estimators) for start, test_start, test_end in splits]
+    if workers == 1:
+        predictions = [_fit_forest_fold(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(args))) as executor:
+            predictions = list(executor.map(_fit_forest_fold, *zip(*args)))
+    # Modèle final réentraîné sur tout l'historique (fenêtre croissante) ou la dernière fenêtre prolongée
+    final_start = splits[-1][0] if window == 'rolling' else 0
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42)
+    model.fit(X[final_start:], y[final_start:])
+    return predictions, model
+
+
+def walk_forward_validate(data, target_column='Close', model='regression', n_folds=5, window='expanding',
+                          train_size=None, horizon=1, n_estimators=100, max_workers=None, symbol=None, registry=None):
+    logging.info(f"Walk-forward validation of {model} model ({window}, {n_folds} folds)")
+    try:
+        # Même registre que les modèles de machine_learning : rien n'est recalculé si les données n'ont pas changé
+        cache_name = f'walk_forward_{model}_{window}_{n_folds}_{horizon}'
+        if registry is not None and symbol is not None:
+            status, entry = registry.lookup(symbol, cache_name, data, target_column)
+            if status == 'hit':
+                logging.info(f"Reusing cached walk-forward {model} results for {symbol}")
+                return entry['result']
+
+        X, y, last_features, index = feature_matrix(data, target_column, horizon)
+        # Historiques courts (5 barres journalières d'ETF) : moins de plis plutôt qu'aucune validation
+        splits = walk_forward_splits(len(X), min(n_folds, len(X) - 1), window, train_size)
+        if model == 'regression':
+            predictions, final_model = _regression_folds(X, y, splits)
+        elif model == 'random_forest':
+            predictions, final_model = _forest_folds(X, y, splits, window, n_estimators, max_workers)
+        else:
+            raise ValueError(f'Unknown model: {model}')
+
+        folds = []
+        for (start, test_start, test_end), fold_pred in zip(splits, predictions):
+            folds.append({
+                'train_start': start, 'train_end': test_start, 'test_end': test_end,
+                'mse': mean_squared_error(y[test_start:test_end], fold_pred),
+            })
+        mse = float(np.mean([fold['mse'] for fold in folds]))
+        forecast = float(final_model.predict(last_features)[0]) if last_features is not None else None
+        logging.info(f"Walk-forward {model} MSE: {mse}, next {target_column} forecast: {forecast}")
+        result = {
+            'model': final_model,
+            'mse': mse,
+            'folds': folds,
+            'predictions': np.concatenate(predictions),
+            # Barres et clôtures suivantes réelles des prédictions hors échantillon
+            'index': index[splits[0][1]:splits[-1][2]],
+            'actual': y[splits[0][1]:splits[-1][2]],
+            'forecast': forecast,
+        }
+        if registry is not None and symbol is not None:
+            registry.store(symbol, cache_name, data, target_column, final_model, result)
+        return result
+    except Exception as e:
+        logging.error(f"Error in walk-forward validation: {e}")
+        return None
+
+
+def _validate_symbol(symbol, data, target_column, models, registry, max_workers):
+    return symbol, {
+        model: walk_forward_validate(data, target_column, model, max_workers=max_workers, symbol=symbol, registry=registry)
+        for model in models
+    }
+
+
+def _collect_batch(executor, frames, target_column, models, registry, results):
+    # Les plis de chaque symbole restent dans son processus
+    futures = {
+        symbol: executor.submit(_validate_symbol, symbol, data, target_column, models, registry, 1)
+        for symbol, data in frames.items()
+    }
+    for symbol, future in futures.items():
+        try:
+            results[symbol] = future.result()[1]
+        except Exception as e:
+            logging.error(f"Error in walk-forward validation for {symbol}: {e}")
+
+
+def walk_forward_batch(frames, target_column='Close', models=('regression', 'random_forest'), registry=None, max_workers=None, executor=None):
+    # Prévisions hors échantillon pour plusieurs symboles, un processus par symbole ; `executor` permet de réutiliser un pool existant
+    logging.info(f"Walk-forward validation of {', '.join(models)} models for {len(frames)} symbols")
+    results = {}
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(frames)))
+    if workers == 1:
+        for symbol, data in frames.items():
+            results[symbol] = _validate_symbol(symbol, data, target_column, models, registry, max_workers)[1]
+    elif executor is not None:
+        _collect_batch(executor, frames, target_column, models, registry, results)
+    elif frames:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            _collect_batch(executor, frames, target_column, models, registry, results)
+    # Les symboles en échec ont le même résultat vide que walk_forward_validate
+    for symbol in frames:
+        results.setdefault(symbol, {model: None for model in models})
+    return results